@@ -1,7 +1,189 @@
-def matrix_multiply(matrix1, matrix2):
-    # This function should be implemented by the students
-    # Placeholder implementation that always raises NotImplementedError
-    raise NotImplementedError("Matrix multiplication function not implemented")
+"""
+Matrix multiplication for matrices stored as lists of lists.
 
+matrix_multiply validates both operands once (shape and element types are checked a row at a
+time), then multiplies them with a pure Python kernel that transposes the second matrix once so
+that every inner product walks two rows sequentially. Large matrices of plain ints/floats/complex
+numbers are handed to NumPy when it is installed and the result is converted back to lists.
 
+Without NumPy, large float matrices (or int matrices whose products are exact in doubles) can be
+multiplied by a pool of processes. The operands are packed once into shared memory buffers of
+doubles and every worker writes its block of result rows straight into a shared result buffer.
+"""
 
+import multiprocessing
+import os
+from array import array
+from itertools import chain
+from multiprocessing import shared_memory
+from numbers import Number
+from operator import mul
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds up large products
+    np = None
+
+# Columns of the second matrix that are kept together while all rows of the first pass over them
+BLOCK_SIZE = 64
+
+# Products with at least this many multiply-adds (rows * inner * columns) go to NumPy
+NUMPY_THRESHOLD = 50**3
+
+# Products with at least this many multiply-adds are split across processes when workers > 1
+PARALLEL_THRESHOLD = 100**3
+
+# Element types NumPy handles exactly like Python for this purpose
+_NUMPY_TYPES = {int, float, complex}
+
+
+def _check_matrix(matrix, name):
+    # Return (rows, columns, element types) of a non-empty rectangular list of lists
+    if not isinstance(matrix, list) or not matrix:
+        raise ValueError(f"{name} must be a non-empty list of rows")
+
+    columns = None
+    types = set()
+    for row in matrix:
+        if not isinstance(row, list) or not row:
+            raise ValueError(f"{name} must be a non-empty list of rows")
+        if columns is None:
+            columns = len(row)
+        elif len(row) != columns:
+            raise ValueError(f"All rows of {name} must have the same length")
+        types.update(map(type, row))  # One pass per row instead of an isinstance call per element
+
+    for element_type in types:
+        if not issubclass(element_type, Number):
+            raise TypeError(f"{name} contains non-numeric elements of type {element_type.__name__}")
+
+    return len(matrix), columns, types
+
+
+def _multiply_blocked(matrix1, matrix2, block=BLOCK_SIZE):
+    # Transpose matrix2 once, then every entry is the sum of products of two sequential rows
+    columns = [list(column) for column in zip(*matrix2)]
+    result = [[0] * len(columns) for _ in matrix1]
+
+    # A block of columns stays in cache while every row of matrix1 is multiplied with it
+    for start in range(0, len(columns), block):
+        block_columns = columns[start : start + block]
+        for row, result_row in zip(matrix1, result):
+            result_row[start : start + block] = [sum(map(mul, row, column)) for column in block_columns]
+    return result
+
+
+def _product_bound(matrix1, matrix2, inner):
+    # Largest possible magnitude of any partial sum of an integer product
+    bound1 = max(max(map(abs, row)) for row in matrix1)
+    bound2 = max(max(map(abs, row)) for row in matrix2)
+    return bound1 * bound2 * inner
+
+
+# Shared buffers of the current pool, attached once per worker process
+_worker_buffers = {}
+
+
+def _attach_buffers(names, inner, columns):
+    # Pool initializer: map the shared operands and result as arrays of doubles
+    for key, name in names.items():
+        memory = shared_memory.SharedMemory(name=name)
+        _worker_buffers[key] = (memory, memory.buf.cast("d"))
+    _worker_buffers["shape"] = (inner, columns)
+
+    # Columns of matrix2 as lists, built once per worker and shared by all of its blocks
+    right = _worker_buffers["right"][1]  # matrix2 transposed, one column per row
+    _worker_buffers["column_rows"] = [right[j * inner : (j + 1) * inner].tolist() for j in range(columns)]
+
+
+def _multiply_rows(block):
+    # Compute result rows start..stop-1 and write them into the shared result buffer
+    start, stop = block
+    inner, columns = _worker_buffers["shape"]
+    left = _worker_buffers["left"][1]
+    result = _worker_buffers["result"][1]
+    column_rows = _worker_buffers["column_rows"]
+
+    for i in range(start, stop):
+        row = left[i * inner : (i + 1) * inner].tolist()
+        result[i * columns : (i + 1) * columns] = array("d", [sum(map(mul, row, column)) for column in column_rows])
+
+
+def _multiply_parallel(matrix1, matrix2, workers):
+    # Pack the operands once into shared memory and let every worker fill a block of result rows
+    rows, inner, columns = len(matrix1), len(matrix2), len(matrix2[0])
+    left = array("d", chain.from_iterable(matrix1))
+    right = array("d", chain.from_iterable(zip(*matrix2)))
+
+    buffers = {}
+    try:
+        for key, size in (("left", len(left)), ("right", len(right)), ("result", rows * columns)):
+            buffers[key] = shared_memory.SharedMemory(create=True, size=8 * size)
+        for key, values in (("left", left), ("right", right)):
+            view = buffers[key].buf.cast("d")
+            view[: len(values)] = values
+            view.release()
+
+        # A few blocks per worker balance the load without many round trips
+        step = max(1, -(-rows // (4 * workers)))
+        blocks = [(start, min(rows, start + step)) for start in range(0, rows, step)]
+        names = {key: memory.name for key, memory in buffers.items()}
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers, initializer=_attach_buffers, initargs=(names, inner, columns)) as pool:
+            pool.map(_multiply_rows, blocks)
+
+        view = buffers["result"].buf.cast("d")
+        flat = view[: rows * columns].tolist()
+        view.release()
+    finally:
+        for memory in buffers.values():
+            memory.close()
+            memory.unlink()
+
+    return [flat[i * columns : (i + 1) * columns] for i in range(rows)]
+
+
+def _multiply_numpy(matrix1, matrix2, types):
+    dtype = complex if complex in types else float if float in types else np.int64
+    return (np.array(matrix1, dtype=dtype) @ np.array(matrix2, dtype=dtype)).tolist()
+
+
+def matrix_multiply(matrix1, matrix2, use_numpy=None, workers=1, parallel_threshold=PARALLEL_THRESHOLD):
+    """
+    Multiply two matrices given as lists of lists and return the product as a list of lists.
+
+    Raises ValueError for empty or ragged matrices and for incompatible dimensions, and TypeError
+    for non-numeric elements. use_numpy=None picks NumPy for large products of int/float/complex
+    matrices (when NumPy is installed), True/False force or disable it.
+
+    When NumPy is not used, products with at least parallel_threshold multiply-adds are split
+    across `workers` processes (None means one per CPU). Only float matrices and int matrices
+    whose results are exact in doubles take this path, everything else stays serial.
+    """
+    rows1, columns1, types1 = _check_matrix(matrix1, "matrix1")
+    rows2, columns2, types2 = _check_matrix(matrix2, "matrix2")
+    if columns1 != rows2:
+        raise ValueError(
+            f"Cannot multiply a {rows1}x{columns1} matrix with a {rows2}x{columns2} matrix"
+        )
+
+    types = types1 | types2
+    if use_numpy is None:
+        use_numpy = np is not None and rows1 * columns1 * columns2 >= NUMPY_THRESHOLD
+    if use_numpy and np is None:
+        raise ImportError("use_numpy=True requires numpy to be installed")
+
+    # Other number types (Fraction, Decimal, bool, big ints) keep their exact Python arithmetic
+    if use_numpy and types <= _NUMPY_TYPES:
+        if types != {int} or _product_bound(matrix1, matrix2, columns1) < 2**63:
+            return _multiply_numpy(matrix1, matrix2, types)
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and rows1 * columns1 * columns2 >= parallel_threshold and types <= {int, float}:
+        if float in types:
+            return _multiply_parallel(matrix1, matrix2, min(workers, rows1))
+        if _product_bound(matrix1, matrix2, columns1) < 2**53:  # Every partial sum is an exact double
+            result = _multiply_parallel(matrix1, matrix2, min(workers, rows1))
+            return [list(map(int, row)) for row in result]
+
+    return _multiply_blocked(matrix1, matrix2)
@@ -0,0 +1,56 @@
+import random
+import unittest
+from unittest import mock
+
+import matmul
+from matmul import matrix_multiply, _multiply_blocked
+
+
+def random_matrix(rows, columns, value):
+    return [[value() for _ in range(columns)] for _ in range(rows)]
+
+
+class TestParallelMatrixMultiplication(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(1)
+
+    def test_float_matches_serial(self):
+        matrix1 = random_matrix(23, 17, lambda: self.rng.uniform(-10, 10))
+        matrix2 = random_matrix(17, 11, lambda: self.rng.uniform(-10, 10))
+        result = matrix_multiply(matrix1, matrix2, use_numpy=False, workers=2, parallel_threshold=1)
+        self.assertEqual(result, _multiply_blocked(matrix1, matrix2))
+
+    def test_int_matches_serial(self):
+        matrix1 = random_matrix(19, 13, lambda: self.rng.randint(-1000, 1000))
+        matrix2 = random_matrix(13, 7, lambda: self.rng.randint(-1000, 1000))
+        result = matrix_multiply(matrix1, matrix2, use_numpy=False, workers=2, parallel_threshold=1)
+        self.assertEqual(result, _multiply_blocked(matrix1, matrix2))
+        self.assertTrue(all(type(x) is int for row in result for x in row))
+
+    def test_large_int_stays_serial(self):
+        # Partial sums past 2**53 are not exact in doubles, so the product is not sent to the workers
+        matrix1 = [[2**40, 3], [5, 2**41]]
+        matrix2 = [[2**30, 1], [7, 2**20]]
+        with mock.patch.object(matmul, "_multiply_parallel", side_effect=AssertionError("parallel path taken")):
+            result = matrix_multiply(matrix1, matrix2, use_numpy=False, workers=2, parallel_threshold=1)
+        self.assertEqual(result, _multiply_blocked(matrix1, matrix2))
+
+    def test_below_threshold_stays_serial(self):
+        matrix1 = random_matrix(4, 4, lambda: self.rng.uniform(-1, 1))
+        matrix2 = random_matrix(4, 4, lambda: self.rng.uniform(-1, 1))
+        with mock.patch.object(matmul, "_multiply_parallel", side_effect=AssertionError("parallel path taken")):
+            result = matrix_multiply(matrix1, matrix2, use_numpy=False, workers=2, parallel_threshold=4**3 + 1)
+        self.assertEqual(result, _multiply_blocked(matrix1, matrix2))
+
+    def test_errors_come_first(self):
+        with mock.patch.object(matmul, "_multiply_parallel", side_effect=AssertionError("parallel path taken")):
+            with self.assertRaises(ValueError):
+                matrix_multiply([[1, 2], [3, 4]], [[1, 2, 3]], use_numpy=False, workers=2, parallel_threshold=1)
+            with self.assertRaises(ValueError):
+                matrix_multiply([[1, 2], [3]], [[1], [2]], use_numpy=False, workers=2, parallel_threshold=1)
+            with self.assertRaises(TypeError):
+                matrix_multiply([[1, "a"], [3, 4]], [[1, 2], [3, 4]], use_numpy=False, workers=2, parallel_threshold=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# batchSpice.py
+
+"""
+Roll No: EE23B110
+Name: Ishaan Seth
+Description: Runs evalSpice on many SPICE files across a pool of worker processes. Every worker pins its BLAS
+library to a fixed number of threads so that the workers do not oversubscribe the cores. Results are streamed
+as JSON lines (one object per file, in completion order) and a throughput summary is printed at the end.
+Inputs: files or glob patterns of SPICE files, --workers (Number of processes), --blas-threads (BLAS threads per process)
+Outputs: one JSON line per file on stdout, the summary on stderr
+
+Usage: python batchSpice.py "testdata/*.ckt" --workers 8
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# Environment variables read by the common BLAS/OpenMP runtimes when they are first loaded
+BLAS_THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def expand_inputs(patterns):
+    # Expand glob patterns in order, names without a match are kept so that they get an error line
+    files = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for name in matches:
+            if name not in seen:
+                seen.add(name)
+                files.append(name)
+    return files
+
+
+def _init_worker(blas_threads):
+    # Workers are spawned, so numpy is not loaded yet and the variables take effect when it is imported
+    for variable in BLAS_THREAD_VARIABLES:
+        os.environ[variable] = str(blas_threads)
+
+    # Also limit runtimes that are already loaded, if threadpoolctl is available
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(blas_threads)
+
+
+def _run_one(filename):
+    # Solve one file and describe the outcome as a JSON-friendly dictionary
+    from evalSpice import evalSpice  # Imported inside the worker, after the BLAS limits are set
+
+    start = time.perf_counter()
+    try:
+        voltages, currents = evalSpice(filename)
+        result = {"file": filename, "ok": True, "voltages": voltages, "currents": currents}
+    except Exception as e:
+        result = {"file": filename, "ok": False, "error": type(e).__name__, "message": str(e)}
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def batchSpice(files, workers=None, blas_threads=1, chunksize=None):
+    """
+    Solve every file in `files` with evalSpice in `workers` processes (default: one per CPU).
+
+    Yields one result dictionary per file as soon as it is done, so the order is the completion
+    order. Successful files have "ok": True with "voltages" and "currents", failed files have
+    "ok": False with the exception type in "error" and its message in "message".
+    """
+    files = list(files)
+    if not files:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(files))
+
+    # A few chunks per worker keeps the pool busy without paying one round trip per small file
+    if chunksize is None:
+        chunksize = max(1, min(64, len(files) // (4 * workers)))
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=_init_worker, initargs=(blas_threads,)) as pool:
+        yield from pool.imap_unordered(_run_one, files, chunksize=chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run evalSpice on many SPICE files in parallel.")
+    parser.add_argument("inputs", nargs="+", help="SPICE files or glob patterns")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--blas-threads", type=int, default=1, help="BLAS threads per worker (default: 1)")
+    parser.add_argument("--chunksize", type=int, default=None, help="files handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    start = time.perf_counter()
+    failed = 0
+    for result in batchSpice(files, args.workers, args.blas_threads, args.chunksize):
+        failed += not result["ok"]
+        print(json.dumps(result), flush=True)
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "files": len(files),
+        "ok": len(files) - failed,
+        "failed": failed,
+        "seconds": elapsed,
+        "files_per_second": len(files) / elapsed if elapsed > 0 else 0.0,
+    }
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+# benchSpice.py
+
+"""
+Roll No: EE23B110
+Name: Ishaan Seth
+Description: Benchmarks the evalSpice solver on generated circuits (resistor ladders, 2-D resistive meshes and
+random sparse networks) from 10^2 to 10^6 nodes. Parsing, stamping and solving are timed separately for every
+backend. The peak memory of each case is measured in a fresh child process as the growth of its peak resident set
+size (VmHWM, or ru_maxrss without /proc), so memory allocated inside LAPACK and SuperLU is counted as well as
+Python/NumPy objects. The results are written as JSON and can be compared against a stored baseline to catch scaling
+regressions.
+Inputs: --sizes, --circuits, --backends, --repeats, --output, --baseline, --save-baseline, --threshold
+Outputs: JSON results (stdout or --output), a comparison report on stderr when --baseline is given
+
+Usage: python benchSpice.py --sizes 100,1000,10000 --save-baseline baseline.json
+       python benchSpice.py --sizes 100,1000,10000 --baseline baseline.json --threshold 0.25
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, the peak memory is then only measured through /proc
+    resource = None
+
+import numpy as np
+
+import evalSpice as spice
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000, 1000000)
+
+# The dense backend needs (nodes + sources)^2 doubles, so it is skipped above this many nodes
+DENSE_MAX_NODES = 5000
+
+# Nodes of the random network only connect to nodes at most this far away in numbering, which keeps
+# the fill-in of the sparse LU bounded (a fully random graph has no small separators)
+RANDOM_WINDOW = 64
+
+PHASES = ("parse", "stamp", "solve")
+
+
+def ladder(nodes):
+    # Series resistors n_k -> n_k+1 with a shunt resistor to GND at every node, driven at n1
+    lines = [".circuit", "V1 n1 GND dc 1"]
+    for k in range(1, nodes):
+        lines.append(f"R{k} n{k} n{k + 1} 1")
+        lines.append(f"Rg{k} n{k + 1} GND 10")
+    lines.append(".end")
+    return lines
+
+
+def mesh(nodes):
+    # Square grid of 1 ohm resistors, driven at one corner and grounded through the opposite corner
+    side = max(2, int(round(nodes**0.5)))
+    lines = [".circuit", "V1 m0_0 GND dc 1"]
+    for i in range(side):
+        for j in range(side):
+            if j + 1 < side:
+                lines.append(f"Rh{i}_{j} m{i}_{j} m{i}_{j + 1} 1")
+            if i + 1 < side:
+                lines.append(f"Rv{i}_{j} m{i}_{j} m{i + 1}_{j} 1")
+    lines.append(f"Rg m{side - 1}_{side - 1} GND 1")
+    lines.append(".end")
+    return lines
+
+
+def random_network(nodes, seed=0):
+    # Random resistor network: a random tree (every node hangs off a nearby earlier one) plus as many
+    # extra random edges again, a few grounded resistors and current sources
+    rng = random.Random(seed)
+    lines = [".circuit", "V1 r0 GND dc 1"]
+    for k in range(1, nodes):
+        lines.append(f"Rt{k} r{k} r{rng.randrange(max(0, k - RANDOM_WINDOW), k)} {rng.uniform(1, 100):.6g}")
+    for k in range(nodes):
+        a = rng.randrange(nodes)
+        b = min(nodes - 1, a + rng.randint(1, RANDOM_WINDOW))
+        if a != b:
+            lines.append(f"Rx{k} r{a} r{b} {rng.uniform(1, 100):.6g}")
+    for k, node in enumerate(rng.sample(range(1, nodes), max(1, nodes // 100))):
+        lines.append(f"Rg{k} r{node} GND {rng.uniform(10, 1000):.6g}")
+        lines.append(f"I{k} r{node} GND dc {rng.uniform(-1e-3, 1e-3):.6g}")
+    lines.append(".end")
+    return lines
+
+
+GENERATORS = {"ladder": ladder, "mesh": mesh, "random": random_network}
+
+
+def write_circuit(kind, nodes, directory):
+    # Generate the circuit once and reuse the file for every backend
+    filename = os.path.join(directory, f"{kind}_{nodes}.ckt")
+    if not os.path.exists(filename):
+        with open(filename, "w") as f:
+            f.write("\n".join(GENERATORS[kind](nodes)) + "\n")
+    return filename
+
+
+def run_phases(filename, backend):
+    # Parse, stamp and solve once, returning the time of each phase in seconds
+    times = {}
+
+    start = time.perf_counter()
+    netlist = spice._read_circuit(filename)
+    spice._check_circuit(netlist)
+    times["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    backend = spice._choose_backend(backend, netlist.matrix_num)
+    G = spice._assemble(*spice._stamp(netlist), netlist.matrix_num, backend)
+    b = spice._source_vector(
+        netlist,
+        spice._netlist_values(netlist, netlist.voltage_sources),
+        spice._netlist_values(netlist, netlist.current_sources),
+    )
+    times["stamp"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spice._results(spice._factorize(G, backend)(b), netlist)
+    times["solve"] = time.perf_counter() - start
+
+    return times, netlist.node_count
+
+
+def _max_rss():
+    # Peak resident set size of this process in bytes, or None if it cannot be measured. On Linux ru_maxrss
+    # also keeps the peak of the parent the process was forked from, so the VmHWM of its own address space is used
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _memory_run(task):
+    # Runs in a fresh process: how far one run raises the peak RSS above the process after its imports
+    filename, backend = task
+    before = _max_rss()
+    run_phases(filename, backend)
+    return _max_rss() - before
+
+
+def peak_memory(filename, backend):
+    """Bytes by which one parse/stamp/solve run raises the peak RSS of a fresh process, or None if RSS is not available."""
+    if _max_rss() is None:
+        return None
+    context = multiprocessing.get_context("spawn")  # A forked child would start with the parent's pages
+    with context.Pool(1) as pool:
+        return pool.apply(_memory_run, ((filename, backend),))
+
+
+def benchmark(filename, backend, repeats=3, memory=True):
+    # Best time of each phase over `repeats` runs, plus the peak memory of one run in a child process
+    best = dict.fromkeys(PHASES, float("inf"))
+    for _ in range(repeats):
+        times, node_count = run_phases(filename, backend)
+        for phase in PHASES:
+            best[phase] = min(best[phase], times[phase])
+
+    result = {"nodes": node_count, "backend": backend}
+    result.update(best)
+    result["total"] = sum(best.values())
+
+    if memory:
+        peak = peak_memory(filename, backend)
+        if peak is not None:
+            result["peak_bytes"] = peak
+    return result
+
+
+def available_backends():
+    return ["dense", "sparse"] if spice.sp is not None else ["dense"]
+
+
+def run_suite(sizes=DEFAULT_SIZES, circuits=tuple(GENERATORS), backends=None, repeats=3, memory=True, directory=None):
+    """Run the benchmark and return a JSON-friendly dictionary with one result per circuit/size/backend."""
+    backends = backends or available_backends()
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for kind in circuits:
+            for nodes in sizes:
+                filename = write_circuit(kind, nodes, directory or scratch)
+                for backend in backends:
+                    if backend == "dense" and nodes > DENSE_MAX_NODES:
+                        continue
+                    result = benchmark(filename, backend, repeats, memory)
+                    result["circuit"] = kind
+                    result["size"] = nodes
+                    results.append(result)
+                    print(f"{kind:>7} {nodes:>8} {backend:>6}  {result['total']:.4f} s", file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold=0.2, min_seconds=1e-3):
+    """
+    Compare two benchmark runs and return a list of regressions.
+
+    A regression is a phase (or the peak memory) of a circuit/size/backend that got more than
+    `threshold` (as a fraction) slower or larger than in the baseline. Timings that grew by less
+    than `min_seconds` are treated as noise.
+    """
+    old = {(r["circuit"], r["size"], r["backend"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results["results"]:
+        key = (r["circuit"], r["size"], r["backend"])
+        if key not in old:
+            continue
+        for metric in PHASES + ("total", "peak_bytes"):
+            if metric in r and old[key].get(metric):
+                ratio = r[metric] / old[key][metric]
+                if metric != "peak_bytes" and r[metric] - old[key][metric] < min_seconds:
+                    continue
+                if ratio > 1 + threshold:
+                    regressions.append({"circuit": key[0], "size": key[1], "backend": key[2], "metric": metric, "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark evalSpice on generated circuits.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma separated node counts")
+    parser.add_argument("--circuits", default=",".join(GENERATORS), help="comma separated circuit kinds")
+    parser.add_argument("--backends", default=None, help="comma separated backends (default: all available)")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per case, the best one is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--save-baseline", help="also store the results as a baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before a regression is reported")
+    args = parser.parse_args(argv)
+
+    results = run_suite(
+        sizes=[int(s) for s in args.sizes.split(",")],
+        circuits=args.circuits.split(","),
+        backends=args.backends.split(",") if args.backends else None,
+        repeats=args.repeats,
+        memory=not args.no_memory,
+    )
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['circuit']} {r['size']} {r['backend']} {r['metric']}: {r['ratio']:.2f}x", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against the baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,224 +6,921 @@ Name: Ishaan Seth
 Date: 08 Sept 2024
 Version: 2
 Description: To write a function (evalSpice) that will read the given SPICE circuit, parse it and solve the circuit by finding all node voltages and branch currents of branches with a voltage source, and raise specific errors for invalid definitions.
-Inputs: filename (Name of the file containing the SPICE circuit)
+Inputs: filename (Name of the file containing the SPICE circuit), backend ("auto", "dense" or "sparse" solver for the MNA system), workers (Number of threads used to solve independent subcircuits)
 Outputs: voltages (Dictionary containing all node voltages), currents (Dictionary containing branch currents through each voltage source)
-"""
-
-import numpy as np
 
+evalSpiceSweep solves the same circuit for many source values at once. The circuit is parsed, stamped
+and factorized a single time, and all sweep points are solved together as one multi-column right-hand side.
+SpiceCircuit keeps the factorization of one circuit around so that resistor values can be changed and
+the circuit re-solved through low-rank (Sherman-Morrison/Woodbury) updates instead of a full rebuild.
+Subcircuits that only share GND are solved as separate, smaller systems, optionally in parallel threads; small
+subcircuits are packed together into block-diagonal systems so that each solve is worth its Python overhead.
+checkCircuit lists topology problems (conflicting sources, voltage source loops, floating nodes) without
+solving; the same checks make every solver raise CircuitError before any matrix is built.
+evalSpiceAC does a small-signal AC analysis with R, L and C elements over a whole array of frequencies,
+stamping the circuit once as A(w) = A0 + jw A1 and solving the frequencies as one batch.
+"""
 
-def evalSpice(filename):
-    try:
-        # Open the SPICE file and read the circuit
-        with open(filename, "r") as file:
-            lines = file.readlines()
+from math import nan as NAN
+from concurrent.futures import ThreadPoolExecutor
 
-        circuit_start = None
-        circuit_end = None
+import numpy as np
 
-        # Finding .circuit and .end boundaries
-        start_flag = False
-        end_flag = False
-        for i, line in enumerate(lines):
+try:
+    import scipy.linalg as sla
+    import scipy.sparse as sp
+    import scipy.sparse.linalg as spla
+except ImportError:  # SciPy is only needed for the sparse backend and for reusing dense LU factors
+    sla = None
+    sp = None
+    spla = None
+
+# Systems with at least this many unknowns are solved with the sparse backend when backend="auto"
+SPARSE_THRESHOLD = 1000
+
+# The dense AC sweep builds at most this many bytes of stacked (F, n, n) matrices at a time
+AC_BATCH_BYTES = 64 * 2**20
+
+# Subcircuits sharing only GND are packed into systems of about this many unknowns before solving
+SUBCIRCUIT_BLOCK_SIZE = 256
+
+# SpiceCircuit refactorizes once the low-rank correction gets larger or worse conditioned than this
+MAX_PENDING_UPDATES = 32
+UPDATE_COND_LIMIT = 1e10
+
+# Elements the parser makes room for before its arrays first have to grow
+INITIAL_CAPACITY = 1024
+
+
+class CircuitError(ValueError):
+    """
+    Raised when a circuit has no unique solution.
+
+    The message is always "Circuit error: no solution". `problems` lists what was found as
+    (description, names) pairs, where names are the element or node names involved.
+    """
+
+    def __init__(self, problems=()):
+        super().__init__("Circuit error: no solution")
+        self.problems = list(problems)
+
+        # Name the offending elements/nodes in the traceback without changing the message
+        if hasattr(self, "add_note"):
+            for description, names in self.problems:
+                if names:
+                    self.add_note(f"{description}: {', '.join(names)}")
+
+
+class _DisjointSet:
+    # Union-find over integer ids with path halving and union by size
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def grow(self, size):
+        # Add singleton sets until there are `size` ids
+        for a in range(len(self.parent), size):
+            self.parent.append(a)
+            self.size.append(1)
+
+    def find(self, a):
+        parent = self.parent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def union(self, a, b):
+        # Merge the sets of a and b, returns False if they were already in the same set
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+
+# Element kind codes used in Netlist.kind
+RESISTOR = 0
+VOLTAGE_SOURCE = 1
+CURRENT_SOURCE = 2
+INDUCTOR = 3
+CAPACITOR = 4
+_KIND_CODES = {"R": RESISTOR, "V": VOLTAGE_SOURCE, "I": CURRENT_SOURCE, "L": INDUCTOR, "C": CAPACITOR}
+
+# Element letters accepted by the DC solvers and by the AC analysis
+_DC_ELEMENTS = ("V", "I", "R")
+_AC_ELEMENTS = ("V", "I", "R", "L", "C")
+
+
+class Netlist:
+    """
+    Compact storage of a parsed circuit.
+
+    Element i is called names[i], has kind code kind[i], connects node1[i] to node2[i] and has
+    value value[i] (ohms, volts, amperes, henries or farads). Sources declared as "ac" have their
+    phase in degrees in phase[i], every other element has NaN there. Node indices refer to
+    node_names, where index 0 is always GND and the other nodes follow in sorted order.
+
+    components[n] labels the subcircuit of node n (GND is -1): nodes joined by resistors or
+    voltage sources without going through GND share a label. grounded[c] tells whether
+    subcircuit c has a resistor or voltage source to GND.
+    """
+
+    def __init__(self, names, kind, node1, node2, value, node_names, components=None, grounded=None, phase=None):
+        self.names = names
+        self.kind = kind
+        self.node1 = node1
+        self.node2 = node2
+        self.value = value
+        self.node_names = node_names
+        self.components = components
+        self.grounded = grounded
+        self.phase = phase
+
+        # Element indices of each kind, in netlist order
+        self.resistors = np.flatnonzero(kind == RESISTOR)
+        self.voltage_sources = np.flatnonzero(kind == VOLTAGE_SOURCE)
+        self.current_sources = np.flatnonzero(kind == CURRENT_SOURCE)
+        self.inductors = np.flatnonzero(kind == INDUCTOR)
+        self.capacitors = np.flatnonzero(kind == CAPACITOR)
+
+    @property
+    def node_count(self):
+        # Number of nodes other than GND
+        return len(self.node_names) - 1
+
+    @property
+    def matrix_num(self):
+        # Total number of rows/columns in the MNA matrix
+        return self.node_count + len(self.voltage_sources)
+
+
+def _parse_element(line, node_ids, elements):
+    # Tokenize one component line, interning its node names into node_ids
+    tokens = line.split()
+    if len(tokens) < 4:
+        raise ValueError("Invalid component definition")
+
+    component_name = tokens[0]
+    node1 = tokens[1]
+    node2 = tokens[2]
+    if node1 == node2:
+        raise ValueError("Invalid node definition")
+
+    if component_name[:1] not in elements:
+        raise ValueError(f"Only {', '.join(elements)} elements are permitted")
+    kind = _KIND_CODES[component_name[:1]]
+
+    # R, L and C carry their value in the fourth field, sources have a type ("dc"/"ac") before the value
+    phase = NAN
+    if kind == RESISTOR or kind == INDUCTOR or kind == CAPACITOR:
+        value = float(tokens[3])
+    else:
+        if len(tokens) < 5:
+            raise ValueError("Invalid component definition")
+        value = float(tokens[4])
+
+        # An "ac" source may give its phase in degrees after the magnitude
+        if tokens[3].lower() == "ac":
+            phase = 0.0
+            if len(tokens) > 5 and not tokens[5].startswith("#"):
+                phase = float(tokens[5])
+
+    id1 = node_ids.setdefault(node1, len(node_ids))
+    id2 = node_ids.setdefault(node2, len(node_ids))
+    return component_name, kind, id1, id2, value, phase
+
+
+def _read_circuit(filename, elements=_DC_ELEMENTS):
+    # Read the SPICE file in a single streaming pass, storing the elements in preallocated typed arrays
+    # that double in size when full and are trimmed to the number of elements at the end
+    capacity = INITIAL_CAPACITY
+    names = []
+    kinds = np.empty(capacity, dtype=np.int8)
+    node1 = np.empty(capacity, dtype=np.int64)
+    node2 = np.empty(capacity, dtype=np.int64)
+    values = np.empty(capacity, dtype=np.float64)
+    phases = np.empty(capacity, dtype=np.float64)
+    count = 0
+    node_ids = {"GND": 0}  # Node name -> index in order of first appearance
+    subcircuits = _DisjointSet(1)  # Nodes joined by R/V elements that do not touch GND
+    grounded_ids = []  # Nodes with an R/V element to GND
+
+    start_flag = False
+    end_flag = False
+    end_before_start = False
+    in_circuit = False
+    component_error = None
+
+    with open(filename, "r") as file:
+        for line in file:
             stripped_line = line.strip()
+
+            # A second .circuit or .end is an error wherever it appears in the file
             if stripped_line == ".circuit":
-                if start_flag == False:
-                    circuit_start = i
-                    start_flag = True
-                elif start_flag == True:
+                if start_flag:
                     raise ValueError("Invalid circuit definition")
-            elif stripped_line == ".end":
-                if end_flag == False:
-                    circuit_end = i
-                    end_flag = True
-                elif end_flag == True:
+                start_flag = True
+                in_circuit = not end_flag
+                end_before_start = end_flag
+                continue
+            if stripped_line == ".end":
+                if end_flag:
                     raise ValueError("Invalid circuit definition")
+                end_flag = True
+                in_circuit = False
+                continue
+
+            if not in_circuit or component_error is not None:
+                continue
+
+            # Errors in the components are only raised once the .circuit/.end markers are known to be valid
+            try:
+                name, kind, id1, id2, value, phase = _parse_element(line, node_ids, elements)
+            except ValueError as error:
+                component_error = error
+                continue
+
+            if count == capacity:
+                capacity *= 2
+                kinds = np.resize(kinds, capacity)
+                node1 = np.resize(node1, capacity)
+                node2 = np.resize(node2, capacity)
+                values = np.resize(values, capacity)
+                phases = np.resize(phases, capacity)
+
+            names.append(name)
+            kinds[count] = kind
+            node1[count] = id1
+            node2[count] = id2
+            values[count] = value
+            phases[count] = phase
+            count += 1
+
+            # Current sources do not tie the voltages of their nodes together
+            if kind != CURRENT_SOURCE:
+                if id1 and id2:
+                    if len(node_ids) > len(subcircuits.parent):
+                        subcircuits.grow(len(node_ids))
+                    subcircuits.union(id1, id2)
+                else:
+                    grounded_ids.append(id1 or id2)
+
+    # Check if the file has valid .circuit and .end markers
+    if not start_flag or not end_flag or end_before_start:
+        raise ValueError("Malformed circuit file")
+    if component_error is not None:
+        raise component_error
+
+    node1 = node1[:count]
+    node2 = node2[:count]
+
+    # Ensure GND node is present, it keeps index 0 and the remaining nodes follow in sorted order
+    if not (np.any(node1 == 0) or np.any(node2 == 0)):
+        raise ValueError(
+            "GND node is missing from the circuit. Please include a GND node."
+        )
+    node_names = ["GND"] + sorted(node for node in node_ids if node != "GND")
+
+    order = np.array([node_ids[node] for node in node_names], dtype=np.intp)
+    remap = np.empty(len(node_ids), dtype=np.intp)
+    remap[order] = np.arange(len(node_names))
+
+    # Label the subcircuits 0, 1, ... and note which of them reach GND
+    subcircuits.grow(len(node_ids))
+    roots = np.array([subcircuits.find(i) for i in order[1:].tolist()], dtype=np.intp)
+    labels = np.unique(roots, return_inverse=True)[1].reshape(-1)
+    components = np.concatenate([[-1], labels])
+    grounded = np.zeros(len(labels) and labels.max() + 1, dtype=bool)
+    grounded[components[remap[grounded_ids]]] = True
+
+    return Netlist(
+        names,
+        kinds[:count].copy(),
+        remap[node1],
+        remap[node2],
+        values[:count].copy(),
+        node_names,
+        components,
+        grounded,
+        phases[:count].copy(),
+    )
+
+
+def _conflicting_sources(netlist, sources, description):
+    # Index sources by their unordered node pair and report pairs driven with different values
+    groups = {}
+    node1 = netlist.node1[sources].tolist()
+    node2 = netlist.node2[sources].tolist()
+    for i, n1, n2 in zip(sources.tolist(), node1, node2):
+        key = (n1, n2) if n1 < n2 else (n2, n1)
+        groups.setdefault(key, []).append(i)
+
+    problems = []
+    for members in groups.values():
+        if len(members) > 1 and len(set(netlist.value[members].tolist())) > 1:
+            problems.append((description, [netlist.names[i] for i in members]))
+    return problems
+
+
+def _voltage_loops(netlist):
+    # A voltage source that closes a loop of voltage sources makes the MNA matrix singular
+    problems = []
+    loops = _DisjointSet(len(netlist.node_names))
+    forest = {}  # Node -> [(neighbour, element)] for the sources that did not close a loop
+    node1 = netlist.node1[netlist.voltage_sources].tolist()
+    node2 = netlist.node2[netlist.voltage_sources].tolist()
+
+    for i, n1, n2 in zip(netlist.voltage_sources.tolist(), node1, node2):
+        if loops.union(n1, n2):
+            forest.setdefault(n1, []).append((n2, i))
+            forest.setdefault(n2, []).append((n1, i))
+            continue
+
+        # Walk the forest from n1 to n2 to name every source in the loop
+        previous = {n1: None}
+        pending = [n1]
+        while n2 not in previous:
+            node = pending.pop()
+            for neighbour, element in forest.get(node, []):
+                if neighbour not in previous:
+                    previous[neighbour] = (node, element)
+                    pending.append(neighbour)
+
+        loop = [netlist.names[i]]
+        node = n2
+        while previous[node] is not None:
+            node, element = previous[node]
+            loop.append(netlist.names[element])
+        problems.append(("loop of voltage sources", loop))
+
+    return problems
+
+
+def _floating_nodes(netlist):
+    # Subcircuits without a resistor or voltage source to GND have no defined voltage
+    groups = {}
+    for node in (np.flatnonzero(~netlist.grounded[netlist.components[1:]]) + 1).tolist():
+        groups.setdefault(netlist.components[node], []).append(netlist.node_names[node])
+
+    return [("nodes with no path to GND", nodes) for nodes in groups.values()]
+
+
+def _find_problems(netlist):
+    # Topology checks that reject circuits without a unique solution before any matrix is built
+    problems = []
+
+    # Current sources between the same pair of nodes must carry the same current
+    problems += _conflicting_sources(
+        netlist, netlist.current_sources, "current sources between the same nodes with different values"
+    )
+
+    # Voltage sources in parallel between the same pair of nodes must have the same value
+    problems += _conflicting_sources(
+        netlist, netlist.voltage_sources, "voltage sources in parallel with different values"
+    )
+
+    problems += _voltage_loops(netlist)
+    problems += _floating_nodes(netlist)
+    return problems
+
+
+def _check_circuit(netlist):
+    problems = _find_problems(netlist)
+    if problems:
+        raise CircuitError(problems)
+
+
+def _admittance_stamps(n1, n2, y):
+    # Triplets for admittances y between nodes n1 and n2, GND has index -1 and gets no row or column
+    has1 = n1 >= 0
+    has2 = n2 >= 0
+    both = has1 & has2
+    rows = np.concatenate([n1[has1], n2[has2], n1[both], n2[both]])  # Self and mutual terms
+    cols = np.concatenate([n1[has1], n2[has2], n2[both], n1[both]])
+    vals = np.concatenate([y[has1], y[has2], -y[both], -y[both]])
+    return rows, cols, vals
+
+
+def _branch_stamps(n1, n2, branch):
+    # Triplets for branch equations V(n1) - V(n2) in rows `branch`, with the branch current entering
+    # n1 and leaving n2 (the symmetric entries)
+    has1 = n1 >= 0
+    has2 = n2 >= 0
+    ones1 = np.ones(np.count_nonzero(has1))
+    ones2 = np.ones(np.count_nonzero(has2))
+    rows = np.concatenate([n1[has1], branch[has1], n2[has2], branch[has2]])
+    cols = np.concatenate([branch[has1], n1[has1], branch[has2], n2[has2]])
+    vals = np.concatenate([ones1, ones1, -ones2, -ones2])
+    return rows, cols, vals
+
+
+def _stamp(netlist):
+    # Non-zero entries of the conductance matrix as (row, column, value) triplets
+    node_count = netlist.node_count
+
+    # Fill in conductances, node indices are shifted so that GND becomes -1
+    resistors = netlist.resistors
+    if np.any(netlist.value[resistors] == 0):
+        raise ValueError("Invalid component definition")
+    conductances = _admittance_stamps(
+        netlist.node1[resistors] - 1, netlist.node2[resistors] - 1, 1 / netlist.value[resistors]
+    )
+
+    # Fill in voltage sources, their equations are added after all node equations
+    voltage_sources = netlist.voltage_sources
+    sources = _branch_stamps(
+        netlist.node1[voltage_sources] - 1,
+        netlist.node2[voltage_sources] - 1,
+        node_count + np.arange(len(voltage_sources)),
+    )
+
+    return tuple(np.concatenate(parts) for parts in zip(conductances, sources))
+
+
+def _source_vector(netlist, v_values, i_values, size=None):
+    # Right-hand side with one column per set of source values
+    # v_values and i_values have one row per voltage/current source and one column per sweep point
+    node_count = netlist.node_count
+    b = np.zeros((size or netlist.matrix_num, v_values.shape[1]), dtype=np.result_type(v_values, i_values))
+
+    # Voltage source values go into the auxiliary equations
+    b[node_count : netlist.matrix_num, :] = v_values
+
+    # Fill in current sources into b vector, current leaves node1 and enters node2
+    n1 = netlist.node1[netlist.current_sources] - 1
+    n2 = netlist.node2[netlist.current_sources] - 1
+    np.add.at(b, n1[n1 >= 0], -i_values[n1 >= 0])
+    np.add.at(b, n2[n2 >= 0], i_values[n2 >= 0])
+
+    return b
 
-        # Check if the file has valid .circuit and .end markers
-        if circuit_start is None or circuit_end is None or circuit_start >= circuit_end:
-            raise ValueError("Malformed circuit file")
-
-        # Extract the component list between .circuit and .end markers
-        component_list = lines[circuit_start + 1 : circuit_end]
-        voltage_sources = []
-        current_sources = []
-        resistors = []
-        nodes = set()
-
-        # Parse the components and categorize them
-        for line in component_list:
-            tokens = line.split()
-            if len(tokens) < 4:
-                raise ValueError("Invalid component definition")
-
-            component_name = tokens[0]
-            node1 = tokens[1]
-            node2 = tokens[2]
-            if node1 == node2:
-                raise ValueError("Invalid node definition")
-            nodes.update([node1, node2])
-
-            # Categorize components based on their type
-            if component_name.startswith("R"):  # Resistor
-                resistors.append(
-                    {
-                        "name": component_name,
-                        "node1": node1,
-                        "node2": node2,
-                        "value": float(tokens[3]),
-                    }
-                )
-            elif component_name.startswith("V"):  # Voltage Source
-                if len(tokens) < 5:
-                    raise ValueError("Invalid component definition")
-
-                voltage_sources.append(
-                    {
-                        "name": component_name,
-                        "node1": node1,  # Positive node of voltage source
-                        "node2": node2,
-                        "value": float(tokens[4]),
-                    }
-                )
-            elif component_name.startswith("I"):  # Current Source
-                if len(tokens) < 5:
-                    raise ValueError("Invalid component definition")
-
-                current_sources.append(
-                    {
-                        "name": component_name,
-                        "node1": node1,
-                        "node2": node2,  # Current flows out through this node
-                        "value": float(tokens[4]),
-                    }
-                )
-            else:
-                raise ValueError("Only V, I, R elements are permitted")
-
-        # Node Mapping
-        node_map = {}
-        node_count = 0
-
-        # Ensure GND node is present and assign it index 0
-        if "GND" in nodes:
-            node_map["GND"] = 0
+
+def _netlist_values(netlist, elements):
+    # Netlist values of the given elements as a column (one sweep point)
+    return netlist.value[elements][:, None]
+
+
+def _choose_backend(backend, matrix_num):
+    # Resolve "auto" to a concrete backend based on the size of the MNA system
+    if backend == "auto":
+        if sp is not None and matrix_num >= SPARSE_THRESHOLD:
+            return "sparse"
+        return "dense"
+    if backend == "sparse" and sp is None:
+        raise ImportError("The sparse backend requires scipy to be installed")
+    if backend not in ("dense", "sparse"):
+        raise ValueError(f"Unknown backend '{backend}', expected 'auto', 'dense' or 'sparse'")
+    return backend
+
+
+def _assemble(rows, cols, vals, matrix_num, backend):
+    # Build the MNA matrix from COO triplets, duplicate entries are summed
+    rows = np.asarray(rows, dtype=np.intp)
+    cols = np.asarray(cols, dtype=np.intp)
+    vals = np.asarray(vals, dtype=float)
+
+    if backend == "sparse":
+        return sp.csc_matrix((vals, (rows, cols)), shape=(matrix_num, matrix_num))
+
+    G = np.bincount(rows * matrix_num + cols, weights=vals, minlength=matrix_num * matrix_num)
+    return G.reshape(matrix_num, matrix_num)
+
+
+def _factorize(G, backend):
+    # LU-factorize G once and return a function solving G x = b for any (multi-column) b
+    try:
+        if backend == "sparse":
+            lu = spla.splu(G)
+            solve = lu.solve
+        elif sla is not None:
+            lu, piv = sla.lu_factor(G, check_finite=False)
+            if not np.all(np.diag(lu)):  # A zero pivot means the matrix is singular
+                raise np.linalg.LinAlgError("Singular matrix")
+            solve = lambda b: sla.lu_solve((lu, piv), b, check_finite=False)
         else:
-            raise ValueError(
-                "GND node is missing from the circuit. Please include a GND node."
-            )
-
-        # Remove GND from the node set and map remaining nodes
-        nodes_without_gnd = sorted(node for node in nodes if node != "GND")
-
-        for idx, node in enumerate(nodes_without_gnd, start=1):
-            node_map[node] = idx
-            node_count += 1
-
-        num_voltage_sources = len(voltage_sources)
-        matrix_num = (
-            node_count + num_voltage_sources
-        )  # Total number of rows/columns in the matrix
-
-        # Initialize matrices for nodal analysis
-        G = np.zeros(
-            (matrix_num, matrix_num)
-        )  # Conductance matrix, containing conductances and coefficients for voltage source equations
-        b = np.zeros(
-            (matrix_num, 1)
-        )  # Column vector containing voltage and current source values
-
-        # Ensure current sources are not in series with different values
-        for i in range(len(current_sources)):
-            for j in range(i + 1, len(current_sources)):
-                i1_node1 = current_sources[i]["node1"]
-                i1_node2 = current_sources[i]["node2"]
-                i2_node1 = current_sources[j]["node1"]
-                i2_node2 = current_sources[j]["node2"]
-
-                if (
-                    (i1_node1 == i2_node1 and i1_node2 == i2_node2)
-                    or (i1_node1 == i2_node2 and i1_node2 == i2_node1)
-                ) and (current_sources[i]["value"] != current_sources[j]["value"]):
-                    raise ValueError("Circuit error: no solution")
-
-        # Ensure voltage sources are not in parallel in between the same pair of nodes with different values
-        for i in range(len(voltage_sources)):
-            for j in range(i + 1, len(voltage_sources)):
-                v1_node1 = voltage_sources[i]["node1"]
-                v1_node2 = voltage_sources[i]["node2"]
-                v2_node1 = voltage_sources[j]["node1"]
-                v2_node2 = voltage_sources[j]["node2"]
-
-                if (
-                    (v1_node1 == v2_node1 and v1_node2 == v2_node2)
-                    or (v1_node1 == v2_node2 and v1_node2 == v2_node1)
-                ) and (voltage_sources[i]["value"] != voltage_sources[j]["value"]):
-                    raise ValueError("Circuit error: no solution")
-
-        # Fill in conductances in the matrix
-        for resistor in resistors:
-            n1 = node_map[resistor["node1"]]
-            n2 = node_map[resistor["node2"]]
-            value = resistor["value"]
-
-            if n1 != 0:  # Only update if n1 is not GND
-                G[n1 - 1, n1 - 1] += 1 / value  # Self-conductance at n1
-
-            if n2 != 0:  # Only update if n2 is not GND
-                G[n2 - 1, n2 - 1] += 1 / value  # Self-conductance at n2
-
-            if n1 != 0 and n2 != 0:  # Mutual conductance between n1 and n2
-                G[n1 - 1, n2 - 1] -= 1 / value
-                G[n2 - 1, n1 - 1] -= 1 / value
-
-        # Fill in voltage sources in the matrix
-        for i, vsource in enumerate(voltage_sources):
-            n1 = node_map[vsource["node1"]]
-            n2 = node_map[vsource["node2"]]
-            row = node_count + i  # Voltage sources are added after all node equations
-
-            if n1 != 0:  # n1 is not GND
-                G[n1 - 1, row] = 1  # Voltage source adds 1 at n1
-                G[row, n1 - 1] = 1  # Symmetric entry
-
-            if n2 != 0:  # n2 is not GND
-                G[n2 - 1, row] = -1  # Voltage source subtracts 1 at n2
-                G[row, n2 - 1] = -1  # Symmetric entry
-
-            b[row, 0] = vsource["value"]
-
-        # Fill in current sources into b vector
-        for current_source in current_sources:
-            n1 = node_map[current_source["node1"]]
-            n2 = node_map[current_source["node2"]]
-            value = current_source["value"]
-
-            if n1 != 0:
-                b[n1 - 1, 0] -= value
-
-            if n2 != 0:
-                b[n2 - 1, 0] += value
-
-        # Solve the system of equations
-        try:
-            x = np.linalg.solve(G, b)
-        except np.linalg.LinAlgError:
-            raise ValueError("Circuit error: no solution")
+            np.linalg.solve(G, np.zeros(G.shape[0]))  # Raises LinAlgError if G is singular
+            solve = lambda b: np.linalg.solve(G, b)
+    except (np.linalg.LinAlgError, RuntimeError):
+        raise CircuitError([("singular MNA matrix", [])])
+
+    def checked_solve(b):
+        x = solve(b)
+        if not np.all(np.isfinite(x)):
+            raise CircuitError([("singular MNA matrix", [])])
+        return x
+
+    return checked_solve
+
+
+def _build(filename, backend):
+    # Parse and stamp the circuit, then factorize its MNA matrix
+    netlist = _read_circuit(filename)
+    _check_circuit(netlist)
+
+    rows, cols, vals = _stamp(netlist)
+    backend = _choose_backend(backend, netlist.matrix_num)
+    G = _assemble(rows, cols, vals, netlist.matrix_num, backend)
+    solve = _factorize(G, backend)
+    return netlist, solve
+
+
+def _results(x, netlist):
+    # Return the voltages and currents
+    node_count = netlist.node_count
+    values = x[:, 0].tolist()  # Plain Python floats
+
+    voltages = dict(zip(netlist.node_names[1:], values[:node_count]))
+    voltages["GND"] = 0.0  # Set the GND node voltage
+
+    currents = dict(zip((netlist.names[i] for i in netlist.voltage_sources), values[node_count:]))
+
+    return voltages, currents
+
+
+def _solve_components(netlist, b, backend, workers):
+    # Solve the subcircuits that hang off GND in separate systems and merge the solutions. Each system
+    # costs a stamp, an assembly and a factorization in Python, so small subcircuits that follow each
+    # other are packed into one block-diagonal system of about SUBCIRCUIT_BLOCK_SIZE unknowns
+    node_count = netlist.node_count
+    num_components = len(netlist.grounded)
+    if num_components > 1:
+        # Unknowns of every subcircuit: its nodes and the currents of its voltage sources
+        sources = netlist.voltage_sources
+        source_nodes = np.maximum(netlist.node1[sources], netlist.node2[sources])
+        sizes = np.bincount(netlist.components[1:], minlength=num_components)
+        sizes += np.bincount(netlist.components[source_nodes], minlength=num_components)
+        first_unknown = np.cumsum(sizes) - sizes
+        blocks = np.unique(first_unknown // SUBCIRCUIT_BLOCK_SIZE, return_inverse=True)[1].reshape(-1)
+        num_components = blocks[-1] + 1
+        labels = np.concatenate([[-1], blocks[netlist.components[1:]]])
+
+    if num_components <= 1:
+        backend = _choose_backend(backend, netlist.matrix_num)
+        G = _assemble(*_stamp(netlist), netlist.matrix_num, backend)
+        return _factorize(G, backend)(b)
+
+    # Group the nodes by block and number them 1, 2, ... within their block
+    node_order = np.argsort(labels[1:], kind="stable") + 1
+    node_bounds = np.searchsorted(labels[node_order], np.arange(num_components + 1))
+    local_index = np.zeros(node_count + 1, dtype=np.intp)
+    local_index[node_order] = np.arange(node_count) - node_bounds[labels[node_order]] + 1
+
+    # Group the resistors and voltage sources the same way, current sources only enter through b
+    elements = np.flatnonzero(netlist.kind != CURRENT_SOURCE)
+    node1 = netlist.node1[elements]
+    element_labels = labels[np.where(node1 > 0, node1, netlist.node2[elements])]
+    order = np.argsort(element_labels, kind="stable")
+    elements = elements[order]
+    element_bounds = np.searchsorted(element_labels[order], np.arange(num_components + 1))
+
+    # Row of each voltage source equation in the full system
+    source_row = np.zeros(len(netlist.kind), dtype=np.intp)
+    source_row[netlist.voltage_sources] = node_count + np.arange(len(netlist.voltage_sources))
+
+    x = np.empty_like(b)
+
+    def solve_component(c):
+        nodes = node_order[node_bounds[c] : node_bounds[c + 1]]
+        members = elements[element_bounds[c] : element_bounds[c + 1]]
+        subcircuit = Netlist(
+            [netlist.names[i] for i in members],
+            netlist.kind[members],
+            local_index[netlist.node1[members]],
+            local_index[netlist.node2[members]],
+            netlist.value[members],
+            ["GND"] + [netlist.node_names[i] for i in nodes],
+        )
+
+        # Rows of the full system that belong to this subcircuit, in the order of its own system
+        rows = np.concatenate([nodes - 1, source_row[members[subcircuit.voltage_sources]]])
+        sub_backend = _choose_backend(backend, subcircuit.matrix_num)
+        G = _assemble(*_stamp(subcircuit), subcircuit.matrix_num, sub_backend)
+        x[rows] = _factorize(G, sub_backend)(b[rows])
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(solve_component, range(num_components)))  # Re-raises errors from the threads
+    else:
+        for c in range(num_components):
+            solve_component(c)
+    return x
+
+
+def evalSpice(filename, backend="auto", workers=1):
+    try:
+        netlist = _read_circuit(filename)
+        _check_circuit(netlist)
+
+        # Solve the system of equations, one subcircuit at a time
+        b = _source_vector(
+            netlist,
+            _netlist_values(netlist, netlist.voltage_sources),
+            _netlist_values(netlist, netlist.current_sources),
+        )
+        return _results(_solve_components(netlist, b, backend, workers), netlist)
 
-        # Return the voltages and currents
-        voltages = {}
-        for node, idx in node_map.items():
-            if idx != 0:
-                voltages[node] = x[idx - 1, 0].item()
+    except FileNotFoundError:
+        raise FileNotFoundError("Please give the name of a valid SPICE file as input")
+
+
+def checkCircuit(filename):
+    """
+    Return the topology problems of the circuit in `filename` without solving it.
+
+    Each problem is a (description, names) pair, for example conflicting sources between the
+    same nodes, loops of voltage sources or groups of nodes with no path to GND. An empty list
+    means none were found.
+    """
+    try:
+        return _find_problems(_read_circuit(filename))
+    except FileNotFoundError:
+        raise FileNotFoundError("Please give the name of a valid SPICE file as input")
 
-        voltages["GND"] = 0.0  # Set the GND node voltage
 
-        currents = {}
-        for i, vsource in enumerate(voltage_sources):
-            currents[vsource["name"]] = x[node_count + i, 0].item()
+def evalSpiceSweep(filename, source_values, backend="auto"):
+    """
+    Solve the circuit in `filename` for many values of its V and I sources.
+
+    source_values maps source names to 1-D sequences of values, one value per sweep point. All
+    sequences must have the same length; sources that are not listed keep their netlist value.
+    Returns (voltages, currents), dictionaries mapping node and voltage source names to arrays
+    with one entry per sweep point.
+    """
+    try:
+        netlist, solve = _build(filename, backend)
+        node_count = netlist.node_count
+
+        source_names = {netlist.names[i] for i in netlist.voltage_sources}
+        source_names.update(netlist.names[i] for i in netlist.current_sources)
+        for name in source_values:
+            if name not in source_names:
+                raise ValueError(f"Unknown source '{name}' in sweep")
+
+        lengths = {len(values) for values in source_values.values()}
+        if len(lengths) > 1:
+            raise ValueError("All swept sources need the same number of values")
+        num_points = lengths.pop() if lengths else 1
+
+        # One row per source and one column per sweep point
+        def sweep_values(sources):
+            values = np.repeat(_netlist_values(netlist, sources), num_points, axis=1)
+            for k, i in enumerate(sources):
+                if netlist.names[i] in source_values:
+                    values[k] = source_values[netlist.names[i]]
+            return values
+
+        # Every sweep point is solved with the same LU factors as one multi-column right-hand side
+        b = _source_vector(
+            netlist,
+            sweep_values(netlist.voltage_sources),
+            sweep_values(netlist.current_sources),
+        )
+        x = solve(b)
+
+        voltages = dict(zip(netlist.node_names[1:], x[:node_count]))
+        voltages["GND"] = np.zeros(num_points)  # Set the GND node voltage
+
+        currents = dict(zip((netlist.names[i] for i in netlist.voltage_sources), x[node_count:]))
 
         return voltages, currents
 
     except FileNotFoundError:
         raise FileNotFoundError("Please give the name of a valid SPICE file as input")
+
+
+def _ac_stamp(netlist):
+    # Triplets of A0 and A1 in the AC system A(w) = A0 + jw A1
+    # Inductor currents are extra unknowns after the voltage source currents, with the equations
+    # V(n1) - V(n2) - jwL I = 0, capacitors add jwC to the node admittances
+    rows0, cols0, vals0 = _stamp(netlist)
+
+    inductors = netlist.inductors
+    inductor_rows = netlist.matrix_num + np.arange(len(inductors))
+    branch = _branch_stamps(netlist.node1[inductors] - 1, netlist.node2[inductors] - 1, inductor_rows)
+    static = tuple(np.concatenate(parts) for parts in zip((rows0, cols0, vals0), branch))
+
+    capacitors = netlist.capacitors
+    admittance = _admittance_stamps(
+        netlist.node1[capacitors] - 1, netlist.node2[capacitors] - 1, netlist.value[capacitors]
+    )
+    reactive = (
+        np.concatenate([admittance[0], inductor_rows]),
+        np.concatenate([admittance[1], inductor_rows]),
+        np.concatenate([admittance[2], -netlist.value[inductors]]),
+    )
+    return static, reactive
+
+
+def _ac_values(netlist, elements):
+    # Phasors of the given sources as a column, sources declared as "dc" are zero in small-signal
+    phase = netlist.phase[elements]
+    phasors = netlist.value[elements] * np.exp(1j * np.deg2rad(np.nan_to_num(phase)))
+    return np.where(np.isnan(phase), 0, phasors)[:, None]
+
+
+def _ac_solve_dense(static, reactive, b, omega):
+    # Solve all frequencies as stacked dense systems, AC_BATCH_BYTES at a time
+    size = len(b)
+    A0 = _assemble(*static, size, "dense")
+    A1 = _assemble(*reactive, size, "dense")
+    x = np.empty((len(omega), size), dtype=complex)
+    batch = max(1, AC_BATCH_BYTES // (16 * size * size))
+
+    for start in range(0, len(omega), batch):
+        w = omega[start : start + batch]
+        A = A0 + 1j * w[:, None, None] * A1
+        try:
+            x[start : start + batch] = np.linalg.solve(A, np.broadcast_to(b[:, None], (len(w), size, 1)))[..., 0]
+        except np.linalg.LinAlgError:
+            raise CircuitError([("singular MNA matrix", [])])
+
+    if not np.all(np.isfinite(x)):
+        raise CircuitError([("singular MNA matrix", [])])
+    return x
+
+
+def _ac_solve_sparse(static, reactive, b, omega):
+    # A0 and A1 share one CSC sparsity pattern, so only the data array changes between frequencies
+    size = len(b)
+    rows = np.concatenate([static[0], reactive[0]]).astype(np.intp)
+    cols = np.concatenate([static[1], reactive[1]]).astype(np.intp)
+    keys, position = np.unique(cols * size + rows, return_inverse=True)  # Column-major order
+
+    num_static = len(static[0])
+    data0 = np.bincount(position[:num_static], weights=static[2], minlength=len(keys))
+    data1 = np.bincount(position[num_static:], weights=reactive[2], minlength=len(keys))
+    indices = keys % size
+    indptr = np.searchsorted(keys // size, np.arange(size + 1))
+
+    x = np.empty((len(omega), size), dtype=complex)
+    for k, w in enumerate(omega.tolist()):
+        A = sp.csc_matrix((data0 + 1j * w * data1, indices, indptr), shape=(size, size))
+        x[k] = _factorize(A, "sparse")(b)
+    return x
+
+
+def evalSpiceAC(filename, frequencies, backend="auto"):
+    """
+    Small-signal AC analysis of the circuit in `filename` at each of the given frequencies (Hz).
+
+    R, L and C elements are allowed. Sources declared as "ac" drive the circuit with their value
+    as magnitude and an optional phase in degrees after it (e.g. "V1 in GND ac 1 45"), sources
+    declared as "dc" are switched off. Returns (nodes, voltages, currents): the node names with
+    "GND" last, a complex array of shape (frequencies, nodes) with the node voltages, and a
+    dictionary mapping voltage source names to complex arrays of their currents.
+    """
+    try:
+        netlist = _read_circuit(filename, _AC_ELEMENTS)
+    except FileNotFoundError:
+        raise FileNotFoundError("Please give the name of a valid SPICE file as input")
+
+    # Floating nodes may still be held by capacitors, so only the source checks apply here
+    problems = _conflicting_sources(
+        netlist, netlist.current_sources, "current sources between the same nodes with different values"
+    )
+    problems += _conflicting_sources(
+        netlist, netlist.voltage_sources, "voltage sources in parallel with different values"
+    )
+    problems += _voltage_loops(netlist)
+    if problems:
+        raise CircuitError(problems)
+
+    omega = 2 * np.pi * np.atleast_1d(np.asarray(frequencies, dtype=float))
+    size = netlist.matrix_num + len(netlist.inductors)
+    static, reactive = _ac_stamp(netlist)
+    b = _source_vector(
+        netlist,
+        _ac_values(netlist, netlist.voltage_sources),
+        _ac_values(netlist, netlist.current_sources),
+        size,
+    )[:, 0]
+
+    if _choose_backend(backend, size) == "sparse":
+        x = _ac_solve_sparse(static, reactive, b, omega)
+    else:
+        x = _ac_solve_dense(static, reactive, b, omega)
+
+    node_count = netlist.node_count
+    nodes = netlist.node_names[1:] + ["GND"]
+    voltages = np.zeros((len(omega), node_count + 1), dtype=complex)  # GND stays at zero
+    voltages[:, :node_count] = x[:, :node_count]
+
+    currents = dict(
+        zip((netlist.names[i] for i in netlist.voltage_sources), x[:, node_count : netlist.matrix_num].T)
+    )
+    return nodes, voltages, currents
+
+
+class SpiceCircuit:
+    """
+    A parsed and factorized circuit whose resistor values can be changed one at a time.
+
+    Changing a resistor between nodes p and q adds (1/R_new - 1/R_old) * u u^T to the MNA matrix,
+    where u = e_p - e_q. These rank-1 changes are collected in U D U^T and solve() applies the
+    Woodbury identity on top of the original LU factors:
+
+        x = x0 - Z (I + D U^T Z)^-1 D U^T x0,   with x0 = A^-1 b and Z = A^-1 U
+
+    The matrix is refactorized when more than max_updates node pairs have changed or when the
+    small correction matrix becomes badly conditioned.
+    """
+
+    def __init__(self, filename, backend="auto", max_updates=MAX_PENDING_UPDATES):
+        try:
+            netlist = _read_circuit(filename)
+        except FileNotFoundError:
+            raise FileNotFoundError("Please give the name of a valid SPICE file as input")
+        _check_circuit(netlist)
+
+        self._netlist = netlist
+        self._resistor_index = {netlist.names[i]: i for i in netlist.resistors}
+        self._max_updates = max_updates
+        self._backend = _choose_backend(backend, netlist.matrix_num)
+        self._b = _source_vector(
+            netlist,
+            _netlist_values(netlist, netlist.voltage_sources),
+            _netlist_values(netlist, netlist.current_sources),
+        )
+
+        self.refactorizations = 0  # Number of full factorizations done so far
+        self._refactor()
+
+    def _refactor(self):
+        # Stamp the current resistor values and factorize from scratch
+        matrix_num = self._netlist.matrix_num
+        rows, cols, vals = _stamp(self._netlist)
+        G = _assemble(rows, cols, vals, matrix_num, self._backend)
+        self._solve = _factorize(G, self._backend)
+        self._x0 = self._solve(self._b)
+        self.refactorizations += 1
+
+        # Pending updates: node pair -> column in Z, with the conductance change of each pair in D
+        self._pairs = {}
+        self._p = []
+        self._q = []
+        self._d = []
+        self._Z = np.empty((matrix_num, 0))
+        self._K = np.empty((0, 0))
+
+    def _incidence(self, M):
+        # U^T M for the pending node pairs, rows for GND (index -1) count as zero
+        p = np.array(self._p)
+        q = np.array(self._q)
+        return np.where(p[:, None] >= 0, M[np.maximum(p, 0)], 0) - M[q]
+
+    def set_resistance(self, name, value):
+        """Change the value of resistor `name` to `value` ohms."""
+        if name not in self._resistor_index:
+            raise ValueError(f"Unknown resistor '{name}'")
+        value = float(value)
+        if value == 0:
+            raise ValueError("Invalid component definition")
+
+        netlist = self._netlist
+        k = self._resistor_index[name]
+        delta = 1 / value - 1 / netlist.value[k]
+        netlist.value[k] = value
+
+        p = netlist.node1[k] - 1
+        q = netlist.node2[k] - 1
+        pair = (min(p, q), max(p, q))
+
+        if pair in self._pairs:
+            # Another change between the same nodes just adds to the existing column
+            self._d[self._pairs[pair]] += delta
+        else:
+            if len(self._pairs) >= self._max_updates:
+                self._refactor()
+                return
+
+            # u = e_p - e_q, without the GND entry for resistors to GND
+            u = np.zeros((netlist.matrix_num, 1))
+            if pair[0] >= 0:
+                u[pair[0], 0] = 1
+            u[pair[1], 0] = -1
+
+            self._pairs[pair] = len(self._d)
+            self._p.append(pair[0])
+            self._q.append(pair[1])
+            self._d.append(delta)
+            self._Z = np.hstack([self._Z, self._solve(u)])
+
+        # Capacitance matrix of the Woodbury correction, refactor when it is close to singular
+        W = self._incidence(self._Z)
+        self._K = np.eye(len(self._d)) + np.array(self._d)[:, None] * W
+        if np.linalg.cond(self._K) > UPDATE_COND_LIMIT:
+            self._refactor()
+
+    def solve(self):
+        """Return (voltages, currents) for the current resistor values, like evalSpice."""
+        x = self._x0
+        if self._d:
+            y = np.linalg.solve(self._K, np.array(self._d)[:, None] * self._incidence(self._x0))
+            x = self._x0 - self._Z @ y
+        return _results(x, self._netlist)
@@ -0,0 +1,353 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import ast
+import pytest
+import numpy as np
+import evalSpice as evalSpice_module
+from evalSpice import evalSpice, evalSpiceSweep, evalSpiceAC, checkCircuit, CircuitError, SpiceCircuit
+from batchSpice import batchSpice
+import benchSpice
+
+# Reuse the circuits shipped with the assignment
+testdata = os.path.join(os.path.dirname(__file__), "..", "a2-spice", "testdata", "")
+
+testparams = [
+    ("test_1.ckt", "test_1.exp"),
+    ("test_2.ckt", "test_2.exp"),
+    ("test_3.ckt", "test_3.exp"),
+    ("test_4.ckt", "test_4.exp"),
+]
+
+
+def checkdiff(Vout, Iout, expFile):
+    """expected outputs are in `expFile`.  Read and compare."""
+    with open(testdata + expFile) as f:
+        (Vexp, Iexp) = ast.literal_eval(f.read())
+    s = 0
+    for i in Vexp.keys():
+        s += abs(Vexp[i] - Vout[i])
+    for i in Iexp.keys():
+        s += abs(Iexp[i] - Iout[i])
+    return s
+
+
+@pytest.mark.parametrize("backend", ["dense", "sparse"])
+@pytest.mark.parametrize("inFile, expFile", testparams)
+def test_backends(inFile, expFile, backend):
+    """Both solver backends give the expected voltages and currents."""
+    (Vout, Iout) = evalSpice(testdata + inFile, backend=backend)
+    assert checkdiff(Vout, Iout, expFile) <= 0.001
+
+
+@pytest.mark.parametrize("backend", ["dense", "sparse"])
+def test_backend_no_solution(backend):
+    with pytest.raises(ValueError) as exc_info:
+        evalSpice(testdata + "test_v_loop.ckt", backend=backend)
+    assert str(exc_info.value) == "Circuit error: no solution"
+
+
+def test_sparse_ladder(tmp_path):
+    """A long resistor ladder above the sparse threshold matches the dense solve."""
+    n = 1500
+    lines = [".circuit", "V1 n1 GND dc 1"]
+    for i in range(1, n):
+        lines.append(f"R{i} n{i} n{i + 1} 1")
+        lines.append(f"Rg{i} n{i + 1} GND 10")
+    lines.append(".end")
+    ckt = tmp_path / "ladder.ckt"
+    ckt.write_text("\n".join(lines) + "\n")
+
+    (Vs, Is) = evalSpice(str(ckt))
+    (Vd, Id) = evalSpice(str(ckt), backend="dense")
+    assert max(abs(Vs[k] - Vd[k]) for k in Vd) < 1e-9
+    assert abs(Is["V1"] - Id["V1"]) < 1e-9
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        evalSpice(testdata + "test_1.ckt", backend="cholesky")
+
+
+def test_sweep_matches_single_solves(tmp_path):
+    """Every sweep point matches a separate evalSpice call with the same source values."""
+    template = ".circuit\nVsource n1 GND dc {v}\nIsource n3 GND dc {i}\nR1 n1 n2 2\nR2 n2 n3 5\nR3 n2 GND 3\n.end\n"
+    v_values = [10.0, -2.0, 0.5]
+    i_values = [1.0, 0.0, 3.0]
+
+    sweep_file = tmp_path / "sweep.ckt"
+    sweep_file.write_text(template.format(v=1, i=1))
+    (Vsweep, Isweep) = evalSpiceSweep(str(sweep_file), {"Vsource": v_values, "Isource": i_values})
+
+    for k, (v, i) in enumerate(zip(v_values, i_values)):
+        point_file = tmp_path / f"point{k}.ckt"
+        point_file.write_text(template.format(v=v, i=i))
+        (Vout, Iout) = evalSpice(str(point_file))
+        for node in Vout:
+            assert abs(Vsweep[node][k] - Vout[node]) < 1e-9
+        assert abs(Isweep["Vsource"][k] - Iout["Vsource"]) < 1e-9
+
+
+def test_sweep_unknown_source():
+    with pytest.raises(ValueError):
+        evalSpiceSweep(testdata + "test_1.ckt", {"V9": [1, 2]})
+
+
+def test_circuit_set_resistance(tmp_path):
+    """Low-rank updates give the same answer as rebuilding the circuit from scratch."""
+    template = ".circuit\nV1 GND 1 dc 10\nR1 1 2 {r1}\nR2 2 3 1e3\nR3 3 4 1e3\nR4 4 5 1e3\nR5 2 GND {r5}\nR6 3 GND 2e3\nR7 4 GND 2e3\nR8 5 GND 2e3\n.end\n"
+    base = tmp_path / "base.ckt"
+    base.write_text(template.format(r1=1e3, r5=2e3))
+    circuit = SpiceCircuit(str(base), max_updates=4)
+
+    for r1, r5 in [(2e3, 2e3), (2e3, 50.0), (10.0, 1e6), (1e3, 2e3)]:
+        circuit.set_resistance("R1", r1)
+        circuit.set_resistance("R5", r5)
+        changed = tmp_path / "changed.ckt"
+        changed.write_text(template.format(r1=r1, r5=r5))
+        (Vexp, Iexp) = evalSpice(str(changed))
+        (Vout, Iout) = circuit.solve()
+        assert max(abs(Vexp[k] - Vout[k]) for k in Vexp) < 1e-9
+        assert abs(Iexp["V1"] - Iout["V1"]) < 1e-12
+    assert circuit.refactorizations == 1
+
+
+def test_circuit_refactors_after_max_updates():
+    circuit = SpiceCircuit(testdata + "test_3.ckt", max_updates=2)
+    for name in ["R1", "R2", "R3"]:
+        circuit.set_resistance(name, 500)
+    assert circuit.refactorizations == 2
+    with pytest.raises(ValueError):
+        circuit.set_resistance("V1", 5)
+
+
+def test_check_circuit_reports_groups(tmp_path):
+    """Every conflicting group is reported with its element or node names."""
+    ckt = tmp_path / "problems.ckt"
+    ckt.write_text(
+        ".circuit\n"
+        "V1 a GND dc 1\n"
+        "V2 GND a dc 3\n"
+        "V3 b c dc 1\n"
+        "V4 c d dc 1\n"
+        "V5 d b dc 1\n"
+        "R1 b GND 1\n"
+        "I1 e GND dc 1\n"
+        "I2 GND e dc 2\n"
+        "R2 e f 1\n"
+        ".end\n"
+    )
+    problems = checkCircuit(str(ckt))
+    assert ("current sources between the same nodes with different values", ["I1", "I2"]) in problems
+    assert ("voltage sources in parallel with different values", ["V1", "V2"]) in problems
+    assert ("loop of voltage sources", ["V2", "V1"]) in problems
+    assert ("loop of voltage sources", ["V5", "V3", "V4"]) in problems
+    assert ("nodes with no path to GND", ["e", "f"]) in problems
+
+    with pytest.raises(CircuitError) as exc_info:
+        evalSpice(str(ckt))
+    assert str(exc_info.value) == "Circuit error: no solution"
+    assert exc_info.value.problems == problems
+
+
+def test_check_circuit_clean():
+    for inFile, _ in testparams:
+        assert checkCircuit(testdata + inFile) == []
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_independent_subcircuits(tmp_path, monkeypatch, workers):
+    """Subcircuits sharing only GND are solved separately and give the same answer as one system."""
+    monkeypatch.setattr(evalSpice_module, "SUBCIRCUIT_BLOCK_SIZE", 1)  # Every subcircuit in its own system
+    lines = [".circuit"]
+    for k in range(5):
+        lines += [
+            f"V{k} a{k} GND dc {k + 1}",
+            f"R{k}a a{k} b{k} {k + 2}",
+            f"R{k}b b{k} GND 3",
+            f"I{k} b{k} c{k} dc 0.5",  # Couples the subcircuits through b only
+            f"R{k}c c{k} GND 7",
+        ]
+    lines.append(".end")
+    ckt = tmp_path / "islands.ckt"
+    ckt.write_text("\n".join(lines) + "\n")
+
+    (Vout, Iout) = evalSpice(str(ckt), workers=workers)
+    (Vexp, Iexp) = evalSpiceSweep(str(ckt), {})  # Solved as one system
+    assert max(abs(Vexp[k][0] - Vout[k]) for k in Vexp) < 1e-12
+    assert max(abs(Iexp[k][0] - Iout[k]) for k in Iexp) < 1e-12
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 256])
+def test_many_tiny_subcircuits(tmp_path, monkeypatch, block_size):
+    """Tiny subcircuits are packed into a few block-diagonal systems instead of one system each."""
+    n = 2000
+    lines = [".circuit", "V0 n0 GND dc 1", "R0 n0 GND 1"]
+    for i in range(1, n):
+        lines.append(f"R{i} n{i} GND {i % 7 + 1}")
+        lines.append(f"I{i} n{i - 1} n{i} dc 1")  # Every node is its own subcircuit
+    lines.append(".end")
+    ckt = tmp_path / "tiny.ckt"
+    ckt.write_text("\n".join(lines) + "\n")
+
+    systems = []
+    factorize = evalSpice_module._factorize
+    monkeypatch.setattr(evalSpice_module, "SUBCIRCUIT_BLOCK_SIZE", block_size)
+    monkeypatch.setattr(evalSpice_module, "_factorize", lambda G, backend: systems.append(G.shape[0]) or factorize(G, backend))
+
+    (Vout, Iout) = evalSpice(str(ckt))
+    assert sum(systems) == n + 1  # n nodes and the current of V0
+    first_unknowns = [0] + list(range(2, n + 1))  # Of every subcircuit, n0 also holds the current of V0
+    assert len(systems) == len({k // block_size for k in first_unknowns})
+    assert max(systems) <= block_size + 1
+
+    monkeypatch.setattr(evalSpice_module, "_factorize", factorize)
+    (Vexp, Iexp) = evalSpiceSweep(str(ckt), {})
+    assert max(abs(Vexp[k][0] - Vout[k]) for k in Vexp) < 1e-12
+    assert abs(Iexp["V0"][0] - Iout["V0"]) < 1e-12
+
+
+def test_floating_subcircuit_is_named(tmp_path):
+    ckt = tmp_path / "floating.ckt"
+    ckt.write_text(".circuit\nV1 1 GND dc 1\nR1 1 GND 1\nR2 x y 1\nI1 x GND dc 1\n.end\n")
+    with pytest.raises(CircuitError) as exc_info:
+        evalSpice(str(ckt))
+    assert exc_info.value.problems == [("nodes with no path to GND", ["x", "y"])]
+
+
+@pytest.mark.parametrize("backend", ["dense", "sparse"])
+def test_ac_rc_lowpass(tmp_path, backend):
+    """An RC low-pass filter follows 1 / (1 + jwRC), a series inductor carries the source current."""
+    ckt = tmp_path / "rc.ckt"
+    ckt.write_text(
+        ".circuit\nV1 in GND ac 2 30\nL1 in mid 1e-3\nR1 mid out 1e3\nC1 out GND 1e-6\n"
+        "Vb b GND dc 5\nRb b GND 10\n.end\n"
+    )
+    f = np.logspace(0, 6, 25)
+    nodes, V, I = evalSpiceAC(str(ckt), f, backend=backend)
+    assert nodes == ["b", "in", "mid", "out", "GND"]
+
+    w = 2 * np.pi * f
+    vin = 2 * np.exp(1j * np.pi / 6)
+    i = vin / (1j * w * 1e-3 + 1e3 + 1 / (1j * w * 1e-6))
+    assert np.allclose(V[:, 3], i / (1j * w * 1e-6))
+    assert np.allclose(I["V1"], -i)  # Current through the source from + to -
+    assert np.allclose(V[:, 0], 0) and np.allclose(I["Vb"], 0)  # dc sources are off
+    assert np.all(V[:, 4] == 0)
+
+
+def test_dc_rejects_reactive_elements(tmp_path):
+    ckt = tmp_path / "rc.ckt"
+    ckt.write_text(".circuit\nV1 in GND dc 1\nR1 in out 1\nC1 out GND 1e-6\n.end\n")
+    with pytest.raises(ValueError, match="Only V, I, R elements are permitted"):
+        evalSpice(str(ckt))
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ("R1 n1 GND abc", "could not convert"),
+        ("V1 n1 GND dc x", "could not convert"),
+        ("X1 n1 GND 5", "Only V, I, R elements are permitted"),
+        ("R1 n1 GND", "Invalid component definition"),
+        ("V1 n1 GND 5", "Invalid component definition"),
+        ("R1 n1 n1 5", "Invalid node definition"),
+    ],
+)
+def test_parser_errors(tmp_path, line, message):
+    ckt = tmp_path / "bad.ckt"
+    ckt.write_text(f".circuit\nV0 n1 GND dc 1\n{line}\nR2 n1 GND 1\n.end\n")
+    with pytest.raises(ValueError, match=message):
+        evalSpice(str(ckt))
+
+
+def test_parser_checks_markers_first(tmp_path):
+    # A bad component inside a file with a broken .circuit/.end pair reports the markers
+    ckt = tmp_path / "bad.ckt"
+    ckt.write_text(".circuit\nX1 n1 GND 5\nR1 n1 GND 1\n")
+    with pytest.raises(ValueError, match="Malformed circuit file"):
+        evalSpice(str(ckt))
+
+
+def test_parser_ignores_lines_outside_circuit(tmp_path):
+    ckt = tmp_path / "ok.ckt"
+    ckt.write_text("title\nX9 a b c\n.circuit\nV1 n1 GND dc 2\nR1 n1 GND 4\n.end\nnotes after the end\n")
+    V, I = evalSpice(str(ckt))
+    assert V == pytest.approx({"GND": 0.0, "n1": 2.0})
+    assert I == pytest.approx({"V1": -0.5})
+
+
+@pytest.mark.parametrize("inFile, expFile", testparams)
+def test_parser_grows_arrays(monkeypatch, inFile, expFile):
+    # Start from room for one element so that every circuit makes the parser arrays grow
+    monkeypatch.setattr(evalSpice_module, "INITIAL_CAPACITY", 1)
+    (Vout, Iout) = evalSpice(filename=testdata + inFile)
+    assert checkdiff(Vout, Iout, expFile) < 1e-5
+
+
+def test_batch_matches_serial():
+    files = [testdata + name for name in sorted(os.listdir(testdata)) if name.endswith(".ckt")]
+    results = {r["file"]: r for r in batchSpice(files, workers=2)}
+    assert sorted(results) == files
+
+    for name in files:
+        try:
+            (Vexp, Iexp) = evalSpice(name)
+        except Exception as e:
+            assert results[name]["ok"] is False
+            assert (results[name]["error"], results[name]["message"]) == (type(e).__name__, str(e))
+        else:
+            assert (results[name]["voltages"], results[name]["currents"]) == (Vexp, Iexp)
+
+
+@pytest.mark.parametrize("kind", list(benchSpice.GENERATORS))
+def test_benchmark_circuits(tmp_path, kind):
+    """The generated benchmark circuits solve, and a run twice as slow as its baseline is reported."""
+    results = benchSpice.run_suite(sizes=[100], circuits=[kind], repeats=1, memory=False, directory=str(tmp_path))
+    assert {r["backend"] for r in results["results"]} == set(benchSpice.available_backends())
+
+    baseline = {"results": [dict(r) for r in results["results"]]}
+    for r in baseline["results"]:
+        for phase in benchSpice.PHASES:
+            r[phase] /= 2
+    regressions = benchSpice.compare(results, baseline, threshold=0.5, min_seconds=0)
+    assert {(g["backend"], g["metric"]) for g in regressions} == {
+        (r["backend"], phase) for r in results["results"] for phase in benchSpice.PHASES if r[phase] > 0
+    }
+
+    (V, I) = evalSpice(str(tmp_path / f"{kind}_100.ckt"), backend="dense")
+    assert len(V) > 90
+
+
+@pytest.mark.skipif(benchSpice._max_rss() is None, reason="peak RSS is not available")
+def test_benchmark_peak_memory(tmp_path):
+    """Peak memory is measured in a child process and includes the LAPACK copy of a dense system."""
+    filename = benchSpice.write_circuit("ladder", 2000, str(tmp_path))
+    result = benchSpice.benchmark(filename, "dense", repeats=1)
+    matrix_bytes = (result["nodes"] + 1) ** 2 * 8
+    assert result["peak_bytes"] >= 1.5 * matrix_bytes  # The MNA matrix and the LU factors
+
+
+def test_benchmark_compare():
+    """compare reports slower phases and larger peak memory, and ignores growth below min_seconds."""
+    def run(parse, solve, peak):
+        result = {"circuit": "ladder", "size": 100, "backend": "dense", "parse": parse, "stamp": 0.01, "solve": solve}
+        result.update(total=parse + 0.01 + solve, peak_bytes=peak)
+        return {"results": [result]}
+
+    baseline = run(parse=0.010, solve=0.010, peak=1000)
+    assert benchSpice.compare(baseline, baseline) == []
+
+    # Slower than the threshold: reported, with the phase and the ratio
+    regressions = benchSpice.compare(run(parse=0.010, solve=0.030, peak=1000), baseline, threshold=0.2)
+    assert [(g["metric"], round(g["ratio"], 6)) for g in regressions] == [("solve", 3.0), ("total", round(0.05 / 0.03, 6))]
+
+    # Three times slower, but by less than min_seconds: noise
+    slow_but_fast = run(parse=0.0001, solve=0.0003, peak=1000)
+    tiny = run(parse=0.0001, solve=0.0001, peak=1000)
+    assert benchSpice.compare(slow_but_fast, tiny, threshold=0.2, min_seconds=1e-3) == []
+    assert [g["metric"] for g in benchSpice.compare(slow_but_fast, tiny, threshold=0.2, min_seconds=0)] == ["solve"]
+
+    # More peak memory: reported whatever min_seconds is
+    regressions = benchSpice.compare(run(parse=0.010, solve=0.010, peak=1500), baseline, threshold=0.2)
+    assert [(g["metric"], g["ratio"]) for g in regressions] == [("peak_bytes", 1.5)]
@@ -0,0 +1,146 @@
+# planck_fit.py
+
+"""
+Fitting Planck's law B(lam) = 2 h c^2 / (lam^5 (exp(h c / (lam k T)) - 1)) to spectral data.
+
+The fit works on the logarithms of the parameters, since T, h, c and k range from 1e-34 to 1e8,
+and uses the analytic Jacobian instead of finite differences. The model is evaluated through
+exp(-x) / -expm1(-x), which neither overflows for large x nor loses precision for small x.
+fit_planck_batch fits many spectra at once across a pool of processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.constants import h as H, c as C, k as K, Wien as WIEN
+from scipy.optimize import least_squares
+
+PARAMETERS = ("T", "h", "c", "k")
+
+# Weight of a weak pull of the log-parameters towards p0. Only two combinations of T, h, c and k
+# (h c^2 and h c / (k T)) are determined by a spectrum, so without it a fit of all four drifts away
+PRIOR_WEIGHT = 1e-3
+
+# Spectra handed to a worker process at a time by fit_planck_batch
+BATCH_CHUNK = 64
+
+
+def planck(lam, T, h, c, k):
+    """Spectral radiance of a black body at wavelength lam, without overflow for large h c / (lam k T)."""
+    lam = np.asarray(lam, dtype=float)
+    x = h * c / (lam * k * T)
+    return 2 * h * c**2 / lam**5 * np.exp(-x) / -np.expm1(-x)
+
+
+def _log_derivatives(lam, T, h, c, k):
+    # B and d(log B)/d(log p) for p = T, h, c, k
+    # With x = h c / (lam k T) and g = x e^x / (e^x - 1) = x / -expm1(-x):
+    #   d log B / d log h = 1 - g,  d log B / d log c = 2 - g,  d log B / d log k = d log B / d log T = g
+    lam = np.asarray(lam, dtype=float)
+    x = h * c / (lam * k * T)
+    B = 2 * h * c**2 / lam**5 * np.exp(-x) / -np.expm1(-x)
+    g = x / -np.expm1(-x)
+    return B, np.stack([g, 1 - g, 2 - g, g], axis=-1)
+
+
+def planck_jacobian(lam, T, h, c, k):
+    """Analytic derivatives of planck() with respect to (T, h, c, k), as an array of shape (len(lam), 4)."""
+    B, log_derivatives = _log_derivatives(lam, T, h, c, k)
+    return B[:, None] * log_derivatives / np.array([T, h, c, k])
+
+
+def initial_guess(lam, intensity):
+    """Starting values (T, h, c, k): T from Wien's displacement law at the brightest sample, the constants for h, c, k."""
+    peak = np.asarray(lam, dtype=float)[np.argmax(intensity)]
+    return np.array([WIEN / peak, H, C, K])
+
+
+def fit_planck(lam, intensity, p0=None, free=("T",), sigma=None):
+    """
+    Fit Planck's law to one spectrum.
+
+    lam and intensity are the data, p0 the starting values of (T, h, c, k) (default: initial_guess)
+    and free the names of the parameters to fit (the others stay at their p0 value). sigma optionally
+    gives the standard deviation of every intensity. Returns (popt, pcov) like curve_fit: popt holds
+    all four values and pcov is 4x4, with zero rows and columns for the fixed parameters.
+    """
+    lam = np.asarray(lam, dtype=float)
+    intensity = np.asarray(intensity, dtype=float)
+    weights = 1.0 if sigma is None else 1 / np.asarray(sigma, dtype=float)
+    index = [PARAMETERS.index(name) for name in free]
+    params = initial_guess(lam, intensity) if p0 is None else np.array(p0, dtype=float)
+
+    # Residuals are divided by the largest intensity so that the optimizer sees numbers of order one
+    scale = np.max(np.abs(intensity * weights)) or 1.0
+
+    def unpack(theta):
+        p = params.copy()
+        p[index] = np.exp(theta)
+        return p
+
+    theta0 = np.log(params[index])
+    anchor = PRIOR_WEIGHT * np.eye(len(index))
+
+    def residuals(theta):
+        fit = (planck(lam, *unpack(theta)) - intensity) * weights / scale
+        return np.concatenate([fit, PRIOR_WEIGHT * (theta - theta0)])
+
+    def jacobian(theta):
+        B, log_derivatives = _log_derivatives(lam, *unpack(theta))
+        return np.vstack([(B * weights / scale)[:, None] * log_derivatives[:, index], anchor])
+
+    # The trust region keeps steps in log-parameters bounded, so the parameters cannot overflow
+    result = least_squares(residuals, theta0, jac=jacobian, method="trf")
+    popt = unpack(result.x)
+
+    # Covariance of the log-parameters from the data rows of the Jacobian at the optimum, scaled by the
+    # residual variance, then propagated to the parameters themselves (d p = p d log p)
+    J = result.jac[: len(lam)] * scale
+    dof = max(1, len(lam) - len(index))
+    residual_variance = np.sum((result.fun[: len(lam)] * scale) ** 2) / dof if sigma is None else 1.0
+    log_cov = np.linalg.pinv(J.T @ J) * residual_variance
+    pcov = np.zeros((4, 4))
+    pcov[np.ix_(index, index)] = log_cov * np.outer(popt[index], popt[index])
+    return popt, pcov
+
+
+def _fit_chunk(args):
+    # Fit a block of spectra in a worker process
+    lam, intensities, p0, free = args
+    popts = np.full((len(intensities), 4), np.nan)
+    pcovs = np.full((len(intensities), 4, 4), np.nan)
+    success = np.zeros(len(intensities), dtype=bool)
+    for i, intensity in enumerate(intensities):
+        try:
+            popts[i], pcovs[i] = fit_planck(lam[i], intensity, p0, free)
+            success[i] = np.all(np.isfinite(popts[i]))
+        except (ValueError, np.linalg.LinAlgError):
+            pass
+    return popts, pcovs, success
+
+
+def fit_planck_batch(lam, intensities, p0=None, free=("T",), workers=None, chunk=BATCH_CHUNK):
+    """
+    Fit Planck's law to many spectra, spread over `workers` processes (None: one per CPU, 1: no pool).
+
+    intensities has one spectrum per row; lam is either shared by all of them (1-D) or has one row
+    per spectrum. Returns (popt, pcov, success) with shapes (M, 4), (M, 4, 4) and (M,); spectra whose
+    fit failed have NaN parameters and success False.
+    """
+    intensities = np.atleast_2d(np.asarray(intensities, dtype=float))
+    lam = np.broadcast_to(np.asarray(lam, dtype=float), intensities.shape)
+    blocks = [
+        (lam[start : start + chunk], intensities[start : start + chunk], p0, tuple(free))
+        for start in range(0, len(intensities), chunk)
+    ]
+
+    if workers == 1:
+        parts = list(map(_fit_chunk, blocks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_fit_chunk, blocks))
+
+    popt = np.concatenate([part[0] for part in parts])
+    pcov = np.concatenate([part[1] for part in parts])
+    success = np.concatenate([part[2] for part in parts])
+    return popt, pcov, success
@@ -0,0 +1,136 @@
+# spectra.py
+
+"""
+Loader for the spectral data files (d1.txt - d4.txt): one "wavelength,intensity" pair per line.
+
+The text is parsed in bulk with NumPy instead of line by line, every line is validated and errors
+name the offending line. Parsed spectra are cached as .npy files keyed by a hash of the file
+contents, so loading an unchanged file again only hashes it and memory-maps the cached array.
+"""
+
+import hashlib
+import os
+import warnings
+
+import numpy as np
+
+# ASCII codes used by the vectorized line check
+NEWLINE = ord("\n")
+COMMA = ord(",")
+
+# Name of the cache directory created next to the data files
+CACHE_DIRNAME = "__spectra_cache__"
+
+
+def _line_error(name, line, message):
+    return ValueError(f"{name}, line {line}: {message}")
+
+
+def _check_lines(lines, name):
+    # Slow path: validate line by line to name the first bad line, returns the numbers of the data lines
+    numbers = []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        fields = line.split(b",")
+        if len(fields) != 2 or not all(field.strip() for field in fields):
+            raise _line_error(name, number, "expected two comma-separated values")
+        for field in fields:
+            try:
+                float(field)
+            except ValueError:
+                raise _line_error(name, number, f"{field.strip().decode(errors='replace')!r} is not a number")
+        numbers.append(number)
+    if not numbers:
+        raise ValueError(f"{name}: no data")
+    return numbers
+
+
+def _parse_values(data):
+    # Parse all numbers of comma-separated data in one C-level pass, None if any field is malformed
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # NumPy only warns when it stops at a bad field
+        try:
+            return np.fromstring(data.replace(b"\n", b","), sep=",")
+        except (ValueError, DeprecationWarning):
+            return None
+
+
+def parse_spectrum(data, name="<data>"):
+    """
+    Parse the bytes of a two-column "wavelength,intensity" file.
+
+    Returns a (2, N) float64 array with the wavelengths in row 0 and the intensities in row 1.
+    Blank lines are skipped. Raises ValueError naming the first bad line if a line does not hold
+    exactly two comma-separated numbers, if a value is not finite or if a wavelength is not positive.
+    """
+    data = bytes(data).rstrip() + b"\n"
+    buffer = np.frombuffer(data, dtype=np.uint8)
+
+    # Well-formed files alternate exactly one comma and one newline per line
+    separators = buffer[np.flatnonzero((buffer == COMMA) | (buffer == NEWLINE))]
+    well_formed = (
+        len(separators) % 2 == 0
+        and bool(np.all(separators[0::2] == COMMA))
+        and bool(np.all(separators[1::2] == NEWLINE))
+    )
+    values = _parse_values(data) if well_formed else None
+
+    if values is None or len(values) != len(separators):
+        # Blank lines or a malformed line: find the culprit, or drop the blank lines and parse again
+        lines = data.splitlines()
+        numbers = _check_lines(lines, name)
+        values = _parse_values(b"\n".join(lines[n - 1] for n in numbers) + b"\n")
+        if values is None or len(values) != 2 * len(numbers):
+            raise ValueError(f"{name}: could not parse the data")
+        numbers = np.array(numbers)
+    else:
+        numbers = np.arange(1, len(values) // 2 + 1)
+
+    spectrum = values.reshape(-1, 2).T.copy()  # Rows are contiguous: spectrum[0] and spectrum[1]
+    bad = np.flatnonzero(~np.isfinite(spectrum).all(axis=0))
+    if len(bad):
+        raise _line_error(name, int(numbers[bad[0]]), "values must be finite")
+    bad = np.flatnonzero(spectrum[0] <= 0)
+    if len(bad):
+        raise _line_error(name, int(numbers[bad[0]]), "wavelength must be positive")
+    return spectrum
+
+
+def _cache_path(path, data, cache_dir):
+    # Cache file named after the data file and the hash of its contents
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    directory = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+    return os.path.join(directory, f"{os.path.basename(path)}.{digest}.npy")
+
+
+def load_spectrum(path, cache_dir=None, use_cache=True):
+    """
+    Load a spectral data file and return (wavelength, intensity) as NumPy arrays.
+
+    With use_cache, the parsed arrays are stored in cache_dir (default: __spectra_cache__ next to
+    the file) under a hash of the file contents. A later load of an unchanged file memory-maps
+    that cache, so the returned arrays are read-only views of it. A changed file gets a new hash
+    and is parsed again.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not use_cache:
+        spectrum = parse_spectrum(data, path)
+        return spectrum[0], spectrum[1]
+
+    cache = _cache_path(path, data, cache_dir)
+    if os.path.exists(cache):
+        spectrum = np.load(cache, mmap_mode="r")  # Zero-copy, pages are read on demand
+        return spectrum[0], spectrum[1]
+
+    spectrum = parse_spectrum(data, path)
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        partial = f"{cache}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            np.save(f, spectrum)
+        os.replace(partial, cache)  # Readers never see a half-written cache file
+    except OSError:
+        pass  # Caching is only an optimization, e.g. the directory may be read-only
+    return spectrum[0], spectrum[1]
@@ -0,0 +1,213 @@
+# temperatures.py
+
+"""
+Columnar loader and linear-trend fitting for globaltemp/GlobalTemperatures.csv.
+
+The file has a "YYYY-MM-DD" date in the first column and numeric columns that may be empty.
+load_temperatures parses the dates once into integer year and month arrays and every other
+column into a float array with NaN for the missing values, without a Python loop over the rows.
+
+rolling_trend fits a straight line to every window of consecutive samples. Instead of solving a
+least-squares problem per window, it differences running sums of n, x, y, x^2 and x*y, so every
+window costs O(1) whatever its length, and trend_table does this for every month and every window
+length from sums computed once.
+"""
+
+import csv
+import os
+import warnings
+
+import numpy as np
+
+# The data file shipped with the assignment
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "globaltemp", "GlobalTemperatures.csv")
+
+# Layout of the date column: "YYYY-MM-DD" followed by the first comma
+DATE_WIDTH = 10
+DASH = ord("-")
+COMMA = ord(",")
+ZERO = ord("0")
+
+
+def _parse_rows(lines, path):
+    # Slow path: parse row by row with the csv module to name the first bad line
+    header = next(csv.reader([lines[0]]))
+    year, month, values = [], [], []
+    for number, line in enumerate(lines[1:], start=2):
+        if not line.strip():
+            continue
+        row = next(csv.reader([line]))
+        if len(row) != len(header):
+            raise ValueError(f"{path}, line {number}: expected {len(header)} fields, found {len(row)}")
+        date = row[0]
+        if len(date) != DATE_WIDTH or date[4] != "-" or date[7] != "-" or not (date[:4] + date[5:7]).isdigit():
+            raise ValueError(f"{path}, line {number}: {date!r} is not a YYYY-MM-DD date")
+        try:
+            values.append([float(field) if field.strip() else np.nan for field in row[1:]])
+        except ValueError as error:
+            raise ValueError(f"{path}, line {number}: {error}")
+        year.append(int(date[:4]))
+        month.append(int(date[5:7]))
+    return header, np.array(year), np.array(month), np.array(values, dtype=float).reshape(-1, len(header) - 1)
+
+
+def _parse_columns(body, columns):
+    # Fast path for a well-formed body, None if the body does not have the expected layout
+    buffer = np.frombuffer(body, dtype=np.uint8)
+    ends = np.flatnonzero(buffer == ord("\n"))
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    if len(starts) == 0 or np.any(ends - starts <= DATE_WIDTH):
+        return None
+
+    # The date and first comma of every row, as a (rows, 11) array of bytes
+    date_bytes = starts[:, None] + np.arange(DATE_WIDTH + 1)
+    dates = buffer[date_bytes]
+    digits = dates[:, [0, 1, 2, 3, 5, 6]].astype(np.int64) - ZERO
+    if (
+        np.any((digits < 0) | (digits > 9))
+        or np.any(dates[:, [4, 7]] != DASH)
+        or np.any(dates[:, DATE_WIDTH] != COMMA)
+    ):
+        return None
+    year = digits[:, :4] @ np.array([1000, 100, 10, 1])
+    month = digits[:, 4:] @ np.array([10, 1])
+
+    # Drop the dates and join the rows with commas, then fill in the empty fields, so the
+    # remaining numbers parse in one call
+    keep = np.ones(len(buffer), dtype=bool)
+    keep[date_bytes] = False
+    numbers = buffer[keep]
+    numbers[numbers == ord("\n")] = COMMA
+    text = b"," + numbers.tobytes()
+    while b",," in text:
+        text = text.replace(b",,", b",nan,")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # NumPy only warns when it stops at a bad field
+        try:
+            values = np.fromstring(text[1:-1], sep=",")
+        except (ValueError, DeprecationWarning):
+            return None
+    if len(values) != len(starts) * columns:
+        return None
+    return year, month, values.reshape(-1, columns)
+
+
+def load_temperatures(path=DEFAULT_PATH):
+    """
+    Load a temperature CSV file into columns.
+
+    Returns a dictionary with integer arrays "year" and "month" and one float64 array per data
+    column, named by the header, in which missing values are NaN (so np.isnan gives the mask of
+    missing data). Raises ValueError naming the first bad line if the file is malformed.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    header_end = data.find(b"\n")
+    if header_end < 0:
+        raise ValueError(f"{path}: no data")
+    header = data[:header_end].decode().strip().split(",")
+    body = data[header_end + 1 :].replace(b"\r\n", b"\n").rstrip() + b"\n"
+
+    parsed = _parse_columns(body, len(header) - 1) if body.strip() else None
+    if parsed is None:
+        header, year, month, values = _parse_rows(data.decode().splitlines(), path)
+    else:
+        year, month, values = parsed
+    if np.any((month < 1) | (month > 12)):
+        bad = int(np.flatnonzero((month < 1) | (month > 12))[0])
+        raise ValueError(f"{path}: month {month[bad]} of row {bad + 1} is out of range")
+
+    table = {"year": year, "month": month}
+    for i, name in enumerate(header[1:]):
+        table[name] = np.ascontiguousarray(values[:, i])
+    return table
+
+
+def monthly_grid(table, column):
+    """
+    Arrange a column by year and month.
+
+    Returns (years, grid) where years runs over every year from the first to the last and grid has
+    shape (12, len(years)): grid[m - 1, i] is the value for month m of years[i], NaN if missing.
+    """
+    year, month = table["year"], table["month"]
+    years = np.arange(year.min(), year.max() + 1)
+    grid = np.full((12, len(years)), np.nan)
+    grid[month - 1, year - years[0]] = table[column]
+    return years, grid
+
+
+def _running_sums(x, y):
+    # Running sums of n, x, y, x^2 and x*y over the valid (non-NaN) samples, with a leading zero,
+    # so the sums over samples i..j-1 are S[..., j] - S[..., i]
+    valid = ~np.isnan(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    terms = np.stack([valid.astype(float), x, y, x * x, x * y])
+    sums = np.zeros(terms.shape[:-1] + (terms.shape[-1] + 1,))
+    np.cumsum(terms, axis=-1, out=sums[..., 1:])
+    return sums
+
+
+def _window_fit(sums, window, reference, min_points):
+    # Slope and intercept (at x = 0) of every window from the running sums
+    S = sums[..., window:] - sums[..., :-window]
+    n, sx, sy, sxx, sxy = S
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sxx_c = sxx - sx * sx / n      # Centred sums, sum((x - mean)^2) and sum((x - mean)(y - mean))
+        sxy_c = sxy - sx * sy / n
+        slope = sxy_c / sxx_c
+        intercept = sy / n - slope * (sx / n + reference)
+    bad = (n < max(min_points, 2)) | ~(sxx_c > 1e-12 * np.maximum(sxx, 1))
+    slope[bad] = np.nan
+    intercept[bad] = np.nan
+    return slope, intercept, n.astype(int)
+
+
+def rolling_trend(x, y, window, min_points=2):
+    """
+    Fit y = slope * x + intercept by least squares to every window of `window` consecutive samples.
+
+    NaN values in y are left out of the fits. x and y have the same shape (or x is 1-D and matches
+    the last axis of y); the windows run along the last axis. Returns (slope, intercept, count), each
+    with the last axis shortened to N - window + 1: entry j covers the samples j .. j + window - 1 and
+    count is the number of valid samples in it. Windows with fewer than min_points valid samples (or
+    whose x values are all equal) have NaN slope and intercept.
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.broadcast_to(np.asarray(x, dtype=float), y.shape)
+    if not 1 <= window <= y.shape[-1]:
+        raise ValueError(f"window must be between 1 and {y.shape[-1]}, got {window}")
+
+    # Sums are taken about the mean of x, so squares of large x (years) do not cost precision
+    reference = float(np.mean(x)) if x.size else 0.0
+    sums = _running_sums(x - reference, y)
+    return _window_fit(sums, window, reference, min_points)
+
+
+def trend_table(table, column, windows, min_points=2):
+    """
+    Linear trends of one column for every month and every window length.
+
+    windows is a sequence of window lengths in years. The running sums are built once for all twelve
+    months, and each window length is then one vectorized difference of them. Returns (years, trends)
+    where trends maps each window length w to a (slope, intercept, count) tuple of arrays of shape
+    (12, len(years)); the entry for month m and year years[i] fits the w years ending at years[i], and is
+    NaN for years less than w - 1 years after the start or with too few valid values. Slopes are per year.
+    """
+    years, grid = monthly_grid(table, column)
+    reference = float(np.mean(years))
+    sums = _running_sums(np.broadcast_to(years - reference, grid.shape), grid)
+
+    trends = {}
+    for window in windows:
+        if not 1 <= window <= len(years):
+            raise ValueError(f"window must be between 1 and {len(years)} years, got {window}")
+        fits = _window_fit(sums, window, reference, min_points)
+        padded = []
+        for fit, fill in zip(fits, (np.nan, np.nan, 0)):
+            full = np.full(grid.shape, fill, dtype=fit.dtype)
+            full[:, window - 1 :] = fit
+            padded.append(full)
+        trends[window] = tuple(padded)
+    return years, trends
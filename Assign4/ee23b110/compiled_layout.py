@@ -0,0 +1,139 @@
+# compiled_layout.py
+
+"""
+Precompiled finger-travel costs for a keyboard layout.
+
+calculate_finger_travel in ee23b110.ipynb looks every character of the text up in the layout and
+recomputes the distances for it. The cost of a character depends only on the layout, so
+CompiledLayout computes it once for every character into a dense array indexed by the character
+code. Scoring a text is then a histogram of its character codes (np.bincount) and a dot product with
+that array, which runs in C and costs O(alphabet) for every further layout scored on the same counts.
+
+The distances follow calculate_finger_travel exactly, including its Shift rule: the shift_start of the
+other hand travels to Shift from the key named ';' (for Shift_R) or 'a' (for Shift_L), whichever
+keys of the layout those are.
+"""
+
+import math
+
+import numpy as np
+
+SHIFT_KEYS = ("Shift_L", "Shift_R")
+
+# Character codes counted by one np.bincount call; bincount converts its input to 64-bit integers,
+# so long texts are counted in chunks to bound the memory used
+COUNT_CHUNK = 1 << 22
+
+
+def get_home_row(keys):
+    """
+    Home row of a layout, as in ee23b110.ipynb: the keys at positions 26-29 (left hand) and 32-35
+    (right hand) of the layout dictionary. Returns (home_keys, finger_mapping).
+    """
+    home_keys = {"left": {}, "right": {}}
+    finger_mapping = {}
+    names = list(keys.keys())
+    for key in names[26:30]:
+        home_keys["left"][key] = key
+        finger_mapping[key] = "left"
+    for key in names[32:36]:
+        home_keys["right"][key] = key
+        finger_mapping[key] = "right"
+    return home_keys, finger_mapping
+
+
+def encode(text):
+    """
+    Character codes of a text as a NumPy array: uint8 for ASCII text, uint32 otherwise.
+    Bytes are taken as one character per byte.
+    """
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        return np.frombuffer(text, dtype=np.uint8)
+    if text.isascii():
+        return np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def count_codes(codes, size):
+    """Histogram of the character codes below size, as an int64 array of length size."""
+    counts = np.zeros(size, dtype=np.int64)
+    for start in range(0, len(codes), COUNT_CHUNK):
+        histogram = np.bincount(codes[start : start + COUNT_CHUNK], minlength=size)
+        counts += histogram[:size]  # Codes of characters beyond the layout are dropped
+    return counts
+
+
+class CompiledLayout:
+    """
+    A layout (keys and characters dictionaries, as in ee23b110.ipynb) with the finger travel of
+    every character precomputed.
+
+    Attributes:
+    - cost: float64 array, cost[ord(char)] is the distance travelled to type char (0 if the
+      layout cannot type it)
+    - usage: int64 array of shape (len(cost), len(key_names)), the number of presses of every key
+      per character
+    - key_names: names of the keys, in the order of the columns of usage
+    """
+
+    def __init__(self, keys, characters):
+        self.keys = keys
+        self.characters = characters
+        self.key_names = list(keys)
+        size = max(256, max(map(ord, characters)) + 1) if characters else 256
+        self.cost = np.zeros(size)
+        self.usage = np.zeros((size, len(self.key_names)), dtype=np.int64)
+
+        home_keys, finger_mapping = get_home_row(keys)
+        # Shift is pressed by the other hand, starting from ';' or 'a' as in calculate_finger_travel
+        shift_start = {"left": (";", "Shift_R"), "right": ("a", "Shift_L")}
+        column = {name: i for i, name in enumerate(self.key_names)}
+
+        for char, key_seq in characters.items():
+            code = ord(char)
+            for key in key_seq:
+                if key not in column:
+                    raise ValueError(f"character {char!r} uses the key {key!r}, which is not in the layout")
+                self.usage[code, column[key]] += 1
+            self.cost[code] = self._character_cost(key_seq, home_keys, finger_mapping, shift_start)
+
+    def _character_cost(self, key_seq, home_keys, finger_mapping, shift_start):
+        # Same distances as calculate_finger_travel: home key to key, plus the way to Shift
+        is_shift_involved = any(key in SHIFT_KEYS for key in key_seq)
+        distance = 0.0
+        for key in key_seq:
+            if key in SHIFT_KEYS:
+                continue
+            finger_used = self.keys[key]["start"]
+            hand = finger_mapping.get(finger_used)
+            if hand is None:
+                raise ValueError(f"key {key!r} starts from {finger_used!r}, which is not a home row key")
+            x1, y1 = self.keys[home_keys[hand][finger_used]]["pos"]
+            x2, y2 = self.keys[key]["pos"]
+            distance += math.hypot(x2 - x1, y2 - y1)
+            if is_shift_involved:
+                start, shift_key = shift_start[hand]
+                (sx, sy), (px, py) = self.keys[start]["pos"], self.keys[shift_key]["pos"]
+                distance += math.hypot(px - sx, py - sy)
+        return distance
+
+    def count(self, text):
+        """Number of occurrences of every character code in text (str or bytes)."""
+        return count_codes(encode(text), len(self.cost))
+
+    def score_counts(self, counts):
+        """Total finger travel for a histogram of character codes (e.g. from count())."""
+        counts = np.asarray(counts)
+        n = min(len(counts), len(self.cost))
+        return float(counts[:n] @ self.cost[:n])
+
+    def score(self, text):
+        """Total finger travel to type text, equal to calculate_finger_travel(text, keys, characters)."""
+        return self.score_counts(self.count(text))
+
+    def key_usage(self, counts):
+        """Presses of every key for a histogram of character codes, as a dictionary like count_key_usage."""
+        counts = np.asarray(counts)
+        n = min(len(counts), len(self.cost))
+        presses = counts[:n] @ self.usage[:n]
+        return {name: int(p) for name, p in zip(self.key_names, presses) if p}
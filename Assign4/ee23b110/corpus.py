@@ -0,0 +1,135 @@
+# corpus.py
+
+"""
+Streaming character counts of text corpora of any size, and key usage and finger travel from them.
+
+count_key_usage in ee23b110.ipynb needs the whole text as one string and counts it one character at a
+time. count_corpus instead splits the files into fixed-size byte ranges that worker processes read
+and count with np.bincount; the histograms are summed at the end. Every range starts and ends on a
+UTF-8 character boundary, so characters split between two ranges are counted exactly once.
+
+analyze_corpus turns one set of counts into the key usage (the input of generate_overlay_heatmap)
+and the total finger travel for every layout, so the data is read only once.
+
+Usage: python corpus.py FILE [FILE ...] [--workers N] [--chunk-size BYTES]
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from compiled_layout import CompiledLayout, count_codes
+from layouts import LAYOUTS
+
+# Bytes read and counted per task
+CHUNK_SIZE = 1 << 24
+
+# Character codes counted, the layouts only type ASCII
+ALPHABET = 256
+
+# Longest run of UTF-8 continuation bytes (0b10xxxxxx) after a lead byte
+MAX_CONTINUATION = 3
+
+
+def _is_continuation(byte):
+    return byte & 0xC0 == 0x80
+
+
+def _boundary(f, offset, size):
+    # First character boundary at or after offset: skip the continuation bytes of a character started earlier
+    if offset <= 0 or offset >= size:
+        return min(max(offset, 0), size)
+    f.seek(offset)
+    for i, byte in enumerate(f.read(MAX_CONTINUATION)):
+        if not _is_continuation(byte):
+            return offset + i
+    return offset + MAX_CONTINUATION  # Invalid UTF-8, the decoder replaces it
+
+
+def chunk_ranges(path, chunk_size=CHUNK_SIZE):
+    """Split a file into (path, start, stop) byte ranges of about chunk_size that start and end on character boundaries."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        bounds = sorted({_boundary(f, offset, size) for offset in range(0, size, chunk_size)} | {size})
+    return [(path, start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def count_bytes(data, size=ALPHABET):
+    """Character counts of UTF-8 encoded text, as an int64 array indexed by character code."""
+    codes = np.frombuffer(data, dtype=np.uint8)
+    if len(codes) and codes.max() >= 0x80:
+        # Non-ASCII text: decode to code points first (invalid bytes become U+FFFD)
+        codes = np.frombuffer(data.decode("utf-8", errors="replace").encode("utf-32-le"), dtype=np.uint32)
+    return count_codes(codes, size)
+
+
+def _count_range(task):
+    # Count one byte range of a file in a worker process
+    path, start, stop, size = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        return count_bytes(f.read(stop - start), size)
+
+
+def count_corpus(paths, chunk_size=CHUNK_SIZE, workers=None, size=ALPHABET):
+    """
+    Count the characters of one or more UTF-8 text files.
+
+    Every file is read in ranges of about chunk_size bytes, counted by `workers` processes (None: one
+    per CPU, 1: in this process) and merged. Returns an int64 array of length size, counts[ord(c)]
+    being the number of occurrences of c; characters with larger codes are not counted.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    tasks = [(path, start, stop, size) for path in paths for path, start, stop in chunk_ranges(path, chunk_size)]
+
+    counts = np.zeros(size, dtype=np.int64)
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            counts += _count_range(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for partial in pool.map(_count_range, tasks):
+                counts += partial
+    return counts
+
+
+def analyze_counts(counts, layouts=LAYOUTS):
+    """
+    Key usage and finger travel of character counts for every layout.
+
+    layouts maps names to (keys, characters). Returns a dictionary name -> (key_usage, distance), where
+    key_usage is the dictionary taken by generate_overlay_heatmap(key_usage, keys, img).
+    """
+    results = {}
+    for name, (keys, characters) in layouts.items():
+        compiled = CompiledLayout(keys, characters)
+        results[name] = (compiled.key_usage(counts), compiled.score_counts(counts))
+    return results
+
+
+def analyze_corpus(paths, layouts=LAYOUTS, chunk_size=CHUNK_SIZE, workers=None):
+    """Count the corpus once and analyze it for every layout. Returns (counts, analyze_counts(counts, layouts))."""
+    counts = count_corpus(paths, chunk_size, workers)
+    return counts, analyze_counts(counts, layouts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Finger travel of text corpora on several keyboard layouts.")
+    parser.add_argument("files", nargs="+", help="UTF-8 text files")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes counted per task")
+    args = parser.parse_args(argv)
+
+    counts, results = analyze_corpus(args.files, chunk_size=args.chunk_size, workers=args.workers)
+    print(f"Characters: {int(counts.sum())}")
+    for name, (key_usage, distance) in results.items():
+        print(f"{name:>8}: total finger travel {distance:.3f} units")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# heatmap_render.py
+
+"""
+Key-usage heatmaps composited with NumPy on a cached picture of the layout.
+
+save_keyboard_layout_as_image in ee23b110.ipynb draws every key with matplotlib for every heatmap.
+Here the picture of a layout is drawn once, cropped like crop_image, and kept as an RGBA array. A
+heatmap is then the 5 x 14 heat_data grid of generate_overlay_heatmap, scaled up to the size of the
+picture, coloured through a lookup table of the same colormap and alpha-blended onto the picture.
+save_heatmaps writes many of them without creating any figure.
+
+The blend is bilinear where the notebook uses imshow's spline36 interpolation, and the colour bar and
+title are not drawn.
+"""
+
+import os
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.figure import Figure
+import matplotlib.image as mpimg
+import matplotlib.patches as patches
+
+# Crop of the rendered figure, as in ee23b110.ipynb: img = crop_image(image, 125, -98, 112, -108)
+CROP = {"left": 125, "right": -98, "top": 112, "bottom": -108}
+
+# Colormap of generate_overlay_heatmap: transparent -> blue -> cyan -> green -> yellow -> red
+HEATMAP_COLORS = [(1, 1, 1, 0), (0, 0, 1, 1), (0, 1, 1, 1), (0, 1, 0, 1), (1, 1, 0, 1), (1, 0, 0, 1)]
+LUT_SIZE = 256
+HEATMAP_ALPHA = 0.55
+
+# zlib level for PNG files written by save_heatmaps, 1 is several times faster than the default 6
+PNG_COMPRESS_LEVEL = 1
+
+# Rows and columns of the heat_data grid
+GRID_SHAPE = (5, 14)
+
+# Pictures of the layouts drawn so far, keyed by the key names and positions
+_base_cache = {}
+_upsample_cache = {}
+_lut = None
+
+
+def _layout_key(keys):
+    return tuple((name, tuple(value["pos"])) for name, value in keys.items())
+
+
+def _draw_layout(keys):
+    # Same drawing as save_keyboard_layout_as_image, returned as an RGBA array
+    fig = Figure(figsize=(10, 5))
+    canvas = FigureCanvas(fig)
+    ax = fig.add_subplot()
+
+    ax.set_xlim(0, 14)
+    ax.set_ylim(0, 5)
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+    for key, value in keys.items():
+        x, y = value["pos"]
+        if key == "Space":
+            ax.add_patch(patches.FancyBboxPatch((3.5, 0.25), 4, 0.5, boxstyle="round,pad=0.2",
+                                                fill=True, facecolor="white", edgecolor="black", alpha=0.7))
+            ax.text(5.5, 0.5, "Space", fontsize=12, ha="center", va="center")
+        elif key == "Shift_L":
+            ax.add_patch(patches.FancyBboxPatch((0.25, 1.25), 1.5, 0.5, boxstyle="round,pad=0.2",
+                                                fill=True, facecolor="white", edgecolor="black", alpha=0.7))
+            ax.text(1, 1.5, "Shift_L", fontsize=12, ha="center", va="center")
+        elif key == "Shift_R":
+            ax.add_patch(patches.FancyBboxPatch((12.25, 1.25), 1.5, 0.5, boxstyle="round,pad=0.2",
+                                                fill=True, facecolor="white", edgecolor="black", alpha=0.7))
+            ax.text(13, 1.5, "Shift_R", fontsize=12, ha="center", va="center")
+        elif key == "Ctrl_L":
+            ax.text(x + 1, y + 0.5, key, fontsize=12, ha="center", va="center",
+                    bbox=dict(boxstyle="round,pad=1.0", facecolor="white", alpha=0.7, edgecolor="black"))
+        elif key == "Ctrl_R":
+            ax.text(x, y + 0.5, key, fontsize=12, ha="center", va="center",
+                    bbox=dict(boxstyle="round,pad=1.0", facecolor="white", alpha=0.7, edgecolor="black"))
+        else:
+            ax.text(int(x) + 0.5, int(y) + 0.5, key, fontsize=12, ha="center", va="center",
+                    bbox=dict(boxstyle="round,pad=1.0", facecolor="white", alpha=0.7, edgecolor="black"))
+
+    ax.set_aspect("equal")
+    ax.axis("off")
+    canvas.draw()
+    image = np.asarray(canvas.buffer_rgba())
+    return image[CROP["top"] : CROP["bottom"], CROP["left"] : CROP["right"]].copy()
+
+
+def base_image(keys):
+    """Cropped picture of a layout as a read-only (H, W, 4) uint8 array, drawn on the first call only."""
+    key = _layout_key(keys)
+    if key not in _base_cache:
+        image = _draw_layout(keys)
+        image.flags.writeable = False
+        _base_cache[key] = image
+    return _base_cache[key]
+
+
+def colormap_lut():
+    """The heatmap colormap as a (LUT_SIZE, 4) float array of RGBA values."""
+    global _lut
+    if _lut is None:
+        cm = LinearSegmentedColormap.from_list("custom_heatmap", HEATMAP_COLORS, N=LUT_SIZE)
+        _lut = cm(np.linspace(0, 1, LUT_SIZE))
+    return _lut
+
+
+def heat_data(key_usage, keys):
+    """The 5 x 14 grid of generate_overlay_heatmap (top row first): key usage at the position of every key."""
+    grid = np.zeros(GRID_SHAPE)
+    for key, usage in key_usage.items():
+        if key not in keys:
+            continue
+        x, y = keys[key]["pos"]
+        if key == "Space":
+            continue  # Not counting space for the heatmap
+        elif key == "Shift_L":
+            grid[int(y), 0:2] += usage / 2
+        elif key == "Shift_R":
+            grid[int(y), 12:14] += usage / 2
+        elif key == "Tab":
+            grid[int(y), 0:2] += usage / 2
+        else:
+            grid[int(y), int(x)] = usage
+    return np.flipud(grid)
+
+
+def _interpolation_matrix(cells, pixels):
+    # (pixels, cells) matrix of bilinear weights of the cell centres at every pixel centre
+    centres = np.clip((np.arange(pixels) + 0.5) * cells / pixels - 0.5, 0, cells - 1)
+    low = np.minimum(centres.astype(int), cells - 2)
+    weight = centres - low
+    matrix = np.zeros((pixels, cells), dtype=np.float32)
+    matrix[np.arange(pixels), low] = 1 - weight
+    matrix[np.arange(pixels), low + 1] = weight
+    return matrix
+
+
+def _upsample(grid, shape):
+    # Bilinear interpolation of the grid onto an image of the given (height, width), as two small
+    # matrix products; the matrices only depend on the sizes and are cached
+    key = (grid.shape, shape)
+    if key not in _upsample_cache:
+        _upsample_cache[key] = (
+            _interpolation_matrix(grid.shape[0], shape[0]),
+            _interpolation_matrix(grid.shape[1], shape[1]).T.copy(),
+        )
+    rows, cols = _upsample_cache[key]
+    return rows @ grid.astype(np.float32) @ cols
+
+
+def _blend_tables(alpha):
+    # Per colormap entry: the factor kept of the base colour and the colour added, in 0-255 units
+    lut = colormap_lut().astype(np.float32)
+    weight = lut[:, 3] * alpha
+    return 1 - weight, lut[:, :3] * weight[:, None] * 255
+
+
+def composite(base, grid, alpha=HEATMAP_ALPHA):
+    """Blend a heat_data grid, normalised to its maximum and coloured by the colormap, onto a base RGBA image."""
+    values = _upsample(np.asarray(grid, dtype=float), base.shape[:2])
+    top = values.max()
+    scale = (LUT_SIZE - 1) / top if top > 0 else 0.0
+    index = np.rint(values * scale).astype(np.uint8)
+
+    keep, add = _blend_tables(alpha)
+    out = base[..., :3] * keep[index][..., None]
+    out += add[index]
+    image = np.empty(base.shape, dtype=np.uint8)
+    np.rint(out, out=out)
+    image[..., :3] = out
+    image[..., 3] = base[..., 3]
+    return image
+
+
+def render_heatmap(key_usage, keys):
+    """Heatmap of key usage (as returned by count_key_usage) over the layout, as an (H, W, 4) uint8 array."""
+    return composite(base_image(keys), heat_data(key_usage, keys))
+
+
+def save_heatmaps(jobs, directory=".", compress_level=PNG_COMPRESS_LEVEL):
+    """
+    Write many heatmaps as images.
+
+    jobs is an iterable of (filename, key_usage, keys); every layout is drawn once however many jobs
+    use it. The image format follows the file extension. Returns the paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for filename, key_usage, keys in jobs:
+        path = os.path.join(directory, filename)
+        options = {"compress_level": compress_level} if filename.lower().endswith(".png") else None
+        mpimg.imsave(path, render_heatmap(key_usage, keys), pil_kwargs=options)
+        paths.append(path)
+    return paths
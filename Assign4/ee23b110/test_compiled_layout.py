@@ -0,0 +1,52 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import json
+import random
+import pytest
+from compiled_layout import CompiledLayout
+from corpus import count_corpus, analyze_counts
+from layouts import LAYOUTS, CHARACTERS
+
+notebook = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ee23b110.ipynb")
+
+
+def notebook_functions(keys):
+    """Run the home row and finger travel cells of ee23b110.ipynb for a layout, as the notebook does for its `keys`."""
+    with open(notebook) as f:
+        cells = ["".join(cell["source"]) for cell in json.load(f)["cells"] if cell["cell_type"] == "code"]
+    namespace = {"keys": keys}
+    for name in ("def get_home_row", "def count_key_usage", "def calculate_finger_travel"):
+        exec(next(cell for cell in cells if name in cell), namespace)
+    return namespace
+
+
+@pytest.fixture(scope="module")
+def text():
+    rng = random.Random(1)
+    return "".join(rng.choice(list(CHARACTERS) + ["\n", "é"]) for _ in range(20000))
+
+
+@pytest.mark.parametrize("name", list(LAYOUTS))
+def test_matches_notebook(name, text):
+    """Finger travel and key usage agree with calculate_finger_travel and count_key_usage for every layout."""
+    keys, characters = LAYOUTS[name]
+    ns = notebook_functions(keys)
+    compiled = CompiledLayout(keys, characters)
+    assert compiled.score(text) == pytest.approx(ns["calculate_finger_travel"](text, keys, characters), rel=1e-12)
+    assert compiled.key_usage(compiled.count(text)) == ns["count_key_usage"](text, characters)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_corpus_matches_notebook(tmp_path, text, workers):
+    """Counting a file in small chunks gives every layout the notebook's finger travel and key usage."""
+    path = tmp_path / "corpus.txt"
+    path.write_text(text, encoding="utf-8")
+    counts = count_corpus(str(path), chunk_size=1001, workers=workers)
+    results = analyze_counts(counts)
+    assert sorted(results) == sorted(LAYOUTS)
+    for name, (keys, characters) in LAYOUTS.items():
+        ns = notebook_functions(keys)
+        key_usage, distance = results[name]
+        assert distance == pytest.approx(ns["calculate_finger_travel"](text, keys, characters), rel=1e-12)
+        assert key_usage == ns["count_key_usage"](text, characters)
@@ -0,0 +1,153 @@
+# kb_anneal.py
+
+"""
+Simulated annealing of keyboard layouts with O(1) evaluation of every key swap.
+
+simulated_annealing in kb_optimzn.ipynb deep-copies the layout, rebuilds char_to_key and walks the
+whole input text for every proposal. The distance is a sum over the characters of the text, and the
+cost of typing a character depends only on the key it is on (plus the Shift travel if it is the
+shifted character of that key). So with the character frequencies counted once, the distance is
+
+    sum over keys k of  freq(unshifted char on k) * d(k) + freq(shifted char on k) * (d(k) + shift(k))
+
+and swapping the characters of two keys only changes the two terms of those keys. SwapEngine keeps
+these per-key frequencies, evaluates a swap in O(1) and applies accepted swaps in place.
+"""
+
+import math
+import random
+from collections import Counter
+
+# Keys whose characters are never swapped, as in propose_new_mapping
+SPECIAL_KEYS = ("Shift_L", "Shift_R", "Space", "Ctrl_L", "Ctrl_R", "Alt_L", "Alt_R")
+
+
+def is_left_side(pos):
+    """A key is on the left side (and is shifted with Shift_R) if it lies left of x = 6.5."""
+    return pos[0] < 6.5
+
+
+def build_key_to_chars(characters):
+    """key_to_chars of kb_optimzn.ipynb: key -> {'unshifted': char, 'shifted': char or None}."""
+    key_to_chars = {}
+    for char, key_sequence in characters.items():
+        if len(key_sequence) == 1:
+            key = key_sequence[0]
+            key_to_chars.setdefault(key, {"unshifted": "", "shifted": None})["unshifted"] = char
+        elif len(key_sequence) == 2:
+            key = key_sequence[1]
+            key_to_chars.setdefault(key, {"unshifted": "", "shifted": None})["shifted"] = char
+
+    # Adding the special characters in case they get missed
+    key_to_chars.setdefault("Alt_L", {"unshifted": "Alt_L", "shifted": "Alt_L"})
+    key_to_chars.setdefault("Alt_R", {"unshifted": "Alt_R", "shifted": "Alt_R"})
+    if "Space" in key_to_chars:
+        key_to_chars["Space"]["shifted"] = None
+    return key_to_chars
+
+
+class SwapEngine:
+    """
+    A layout being optimized: the characters on every key and the total distance for a fixed text.
+
+    text is the input text (or a mapping char -> number of occurrences), keys the physical layout
+    and key_to_chars the initial assignment of characters to keys, which is not modified.
+
+    Attributes:
+    - distance: total finger travel of the current assignment, as compute_total_distance
+    - movable: indices of the keys whose characters may be swapped
+    """
+
+    def __init__(self, text, keys, key_to_chars):
+        self.frequencies = Counter(text) if isinstance(text, str) else dict(text)
+        self.key_names = list(key_to_chars)
+        self.chars = [(chars["unshifted"], chars["shifted"]) for chars in key_to_chars.values()]
+        self.movable = [i for i, key in enumerate(self.key_names) if key not in SPECIAL_KEYS]
+
+        # Cost of the unshifted and the shifted character of every key
+        self.unshifted_cost = []
+        self.shifted_cost = []
+        for key in self.key_names:
+            key_pos = keys[key]["pos"]
+            key_distance = math.dist(key_pos, keys[keys[key]["start"]]["pos"])
+            if is_left_side(key_pos):
+                shift_key, shift_start_key = "Shift_R", ";"  # Home row key for right pinky
+            else:
+                shift_key, shift_start_key = "Shift_L", "a"  # Home row key for left pinky
+            shift_distance = math.dist(keys[shift_key]["pos"], keys[shift_start_key]["pos"])
+            self.unshifted_cost.append(key_distance)
+            self.shifted_cost.append(key_distance + shift_distance)
+
+        self.set_chars(self.chars)
+
+    def set_chars(self, chars):
+        """Replace the current assignment by chars, a list of (unshifted, shifted) per key."""
+        self.chars = list(chars)
+        # Occurrences of the characters currently on every key
+        self.unshifted_freq = [self.frequencies.get(u, 0) for u, s in self.chars]
+        self.shifted_freq = [self.frequencies.get(s, 0) for u, s in self.chars]
+        self.distance = self.total_distance()
+
+    def total_distance(self, chars=None):
+        """Distance of an assignment (default: the current one), summed from scratch in O(number of keys)."""
+        chars = self.chars if chars is None else chars
+        return math.fsum(
+            self.frequencies.get(u, 0) * cu + self.frequencies.get(s, 0) * cs
+            for (u, s), cu, cs in zip(chars, self.unshifted_cost, self.shifted_cost)
+        )
+
+    def delta(self, i, j):
+        """Change of the distance if the characters of keys i and j were swapped."""
+        fu_i, fs_i = self.unshifted_freq[i], self.shifted_freq[i]
+        fu_j, fs_j = self.unshifted_freq[j], self.shifted_freq[j]
+        cu_i, cs_i = self.unshifted_cost[i], self.shifted_cost[i]
+        cu_j, cs_j = self.unshifted_cost[j], self.shifted_cost[j]
+        return (fu_i - fu_j) * (cu_j - cu_i) + (fs_i - fs_j) * (cs_j - cs_i)
+
+    def swap(self, i, j, delta=None):
+        """Swap the characters of keys i and j in place."""
+        if delta is None:
+            delta = self.delta(i, j)
+        self.chars[i], self.chars[j] = self.chars[j], self.chars[i]
+        self.unshifted_freq[i], self.unshifted_freq[j] = self.unshifted_freq[j], self.unshifted_freq[i]
+        self.shifted_freq[i], self.shifted_freq[j] = self.shifted_freq[j], self.shifted_freq[i]
+        self.distance += delta
+
+    def key_to_chars(self, chars=None):
+        """The assignment (default: the current one) as a key_to_chars dictionary."""
+        chars = self.chars if chars is None else chars
+        return {key: {"unshifted": u, "shifted": s} for key, (u, s) in zip(self.key_names, chars)}
+
+
+def simulated_annealing(input_text, keys, initial_key_to_chars, initial_temp, cooling_rate, iterations, rng=None):
+    """
+    Simulated annealing as in kb_optimzn.ipynb, with the same moves and acceptance rule.
+
+    Every proposal swaps two random movable keys and costs O(1) instead of a pass over the text.
+    rng is a random.Random (default: the random module). Returns (best_key_to_chars, best_distance,
+    distances) with the distance after every iteration.
+    """
+    rng = rng or random
+    engine = SwapEngine(input_text, keys, initial_key_to_chars)
+    movable = engine.movable
+    best_chars = list(engine.chars)
+    best_distance = engine.distance
+    distances = [engine.distance]
+    temp = initial_temp
+
+    for _ in range(iterations):
+        i, j = rng.sample(movable, 2)
+        delta = engine.delta(i, j)
+
+        # At temperature 0 (e.g. after cooling underflows) only improvements are accepted
+        if delta < 0 or (temp > 0 and rng.uniform(0, 1) < math.exp(-delta / temp)):
+            engine.swap(i, j, delta)
+            if engine.distance < best_distance:
+                best_chars = list(engine.chars)
+                best_distance = engine.distance
+
+        temp *= cooling_rate
+        distances.append(engine.distance)
+
+    # The running distance collects rounding errors, so the best one is summed again
+    return engine.key_to_chars(best_chars), engine.total_distance(best_chars), distances
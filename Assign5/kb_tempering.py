@@ -0,0 +1,156 @@
+# kb_tempering.py
+
+"""
+Parallel tempering of keyboard layouts across CPU cores.
+
+simulated_annealing runs a single chain whose temperature decays to almost zero within about a
+thousand iterations, after which it only descends greedily. Here N replicas run at fixed
+temperatures of a geometric ladder, each in a worker process. After every round of iterations,
+neighbouring replicas may exchange their layouts with the Metropolis probability
+min(1, exp((1/T_i - 1/T_j) (E_i - E_j))), so good layouts found while hot are refined by the cold
+replicas and cold replicas stuck in a local minimum can escape through the hot ones. The best
+layout seen by any replica is kept throughout.
+
+Every replica draws its random numbers from a seed derived from (seed, replica, round), so results
+do not depend on the number of worker processes.
+"""
+
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+
+import numpy as np
+
+from kb_anneal import SwapEngine
+
+# Defaults: the notebook starts annealing at 1000 and ends close to 0
+T_MIN = 1.0
+T_MAX = 1000.0
+ROUND_ITERATIONS = 1000
+
+# SwapEngine of a worker process, built once by _init_worker
+_engine = None
+
+
+def temperature_ladder(t_min, t_max, replicas):
+    """Geometrically spaced temperatures from t_min (replica 0) to t_max."""
+    if replicas == 1:
+        return [float(t_min)]
+    return list(np.geomspace(t_min, t_max, replicas))
+
+
+def _replica_seed(seed, replica, round_number):
+    # Independent seed for every replica and round, derived from the user's seed
+    sequence = np.random.SeedSequence(entropy=seed, spawn_key=(replica, round_number))
+    return int(sequence.generate_state(1, dtype=np.uint64)[0])
+
+
+def _init_worker(frequencies, keys, key_to_chars):
+    global _engine
+    _engine = SwapEngine(frequencies, keys, key_to_chars)
+
+
+def _run_replica(task):
+    # Metropolis moves at a fixed temperature, starting from the given layout
+    chars, temperature, iterations, seed = task
+    engine = _engine
+    engine.set_chars(chars)
+    rng = random.Random(seed)
+    movable = engine.movable
+    best_chars = list(engine.chars)
+    best_distance = engine.distance
+    accepted = 0
+
+    for _ in range(iterations):
+        i, j = rng.sample(movable, 2)
+        delta = engine.delta(i, j)
+        if delta < 0 or rng.random() < math.exp(-delta / temperature):
+            engine.swap(i, j, delta)
+            accepted += 1
+            if engine.distance < best_distance:
+                best_chars = list(engine.chars)
+                best_distance = engine.distance
+
+    return engine.chars, engine.total_distance(), best_chars, engine.total_distance(best_chars), accepted
+
+
+def parallel_tempering(
+    input_text,
+    keys,
+    initial_key_to_chars,
+    replicas=8,
+    rounds=100,
+    iterations=ROUND_ITERATIONS,
+    t_min=T_MIN,
+    t_max=T_MAX,
+    workers=None,
+    seed=0,
+):
+    """
+    Optimize a layout with `replicas` chains at temperatures from t_min to t_max.
+
+    Every round runs `iterations` swap proposals per replica, spread over `workers` processes
+    (None: one per CPU, 1: in this process), then tries to exchange the layouts of neighbouring
+    replicas. All replicas start from initial_key_to_chars.
+
+    Returns (best_key_to_chars, best_distance, stats), where stats holds the temperatures, the
+    acceptance rate of the moves at every temperature, the acceptance rate of the exchanges
+    between temperatures i and i + 1, and the best distance after every round.
+    """
+    frequencies = Counter(input_text) if isinstance(input_text, str) else dict(input_text)
+    engine = SwapEngine(frequencies, keys, initial_key_to_chars)
+    temperatures = temperature_ladder(t_min, t_max, replicas)
+    exchange_rng = random.Random(seed)
+
+    states = [list(engine.chars) for _ in range(replicas)]
+    energies = [engine.distance] * replicas
+    best_chars, best_distance = list(engine.chars), engine.distance
+    accepted = [0] * replicas
+    exchanges_tried = [0] * max(replicas - 1, 0)
+    exchanges_accepted = [0] * max(replicas - 1, 0)
+    history = []
+
+    pool = None
+    if workers != 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(frequencies, keys, initial_key_to_chars)
+        )
+    else:
+        _init_worker(frequencies, keys, initial_key_to_chars)
+
+    try:
+        for round_number in range(rounds):
+            tasks = [
+                (states[r], temperatures[r], iterations, _replica_seed(seed, r, round_number))
+                for r in range(replicas)
+            ]
+            results = list(pool.map(_run_replica, tasks)) if pool else list(map(_run_replica, tasks))
+
+            for r, (chars, distance, round_best_chars, round_best, count) in enumerate(results):
+                states[r], energies[r] = chars, distance
+                accepted[r] += count
+                if round_best < best_distance:
+                    best_chars, best_distance = round_best_chars, round_best
+
+            # Exchange between neighbours, alternating the even and the odd pairs every round
+            for i in range(round_number % 2, replicas - 1, 2):
+                exchanges_tried[i] += 1
+                exponent = (1 / temperatures[i] - 1 / temperatures[i + 1]) * (energies[i] - energies[i + 1])
+                if exponent >= 0 or exchange_rng.random() < math.exp(exponent):
+                    states[i], states[i + 1] = states[i + 1], states[i]
+                    energies[i], energies[i + 1] = energies[i + 1], energies[i]
+                    exchanges_accepted[i] += 1
+
+            history.append(best_distance)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    stats = {
+        "temperatures": temperatures,
+        "acceptance_rates": [count / (rounds * iterations) if rounds * iterations else 0.0 for count in accepted],
+        "exchange_rates": [a / t if t else 0.0 for a, t in zip(exchanges_accepted, exchanges_tried)],
+        "best_distances": history,
+    }
+    return engine.key_to_chars(best_chars), best_distance, stats
@@ -1,10 +1,31 @@
 # compare_methods.py
 
-import timeit
-import numpy as np
+import argparse
+import json
 import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+# The integrators live one directory up (Assign6), next to the built cy_trapz extension
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
 from py_trapz import py_trapz  # Import pure Python trapezoidal implementation
-import cy_trapz                # Import Cython trapezoidal implementation
+from np_trapz import np_trapz, trapz_batch  # Import chunked and batched NumPy trapezoidal implementations
+from romberg import romberg    # Import Romberg integration
+
+try:
+    import cy_trapz            # Import Cython trapezoidal implementation (needs setup.py to be run)
+except ImportError:
+    cy_trapz = None
+
+# np.trapz was renamed to np.trapezoid in NumPy 2.0
+trapezoid = getattr(np, "trapezoid", None) or np.trapz
 
 # Define scalar functions for Python and Cython implementations
 def f1_scalar(x):
@@ -40,146 +61,216 @@ def f4_vector(x):
     """Vectorized function f(x) = 1/x for NumPy."""
     return 1 / x  # NumPy handles division for arrays
 
-# Configuration for timeit measurements
-TIMEIT_REPEATS = 5    # Number of times to repeat the timing
-TIMEIT_NUMBER = 1     # Number of executions per repeat
+# Native (C) integrands for cy_trapz, built from its kernel registry
+NATIVE = {}
+if cy_trapz is not None and hasattr(cy_trapz, "KERNELS"):
+    NATIVE = {
+        "f1": cy_trapz.KERNELS["poly"]([0, 0, 1]),
+        "f2": cy_trapz.KERNELS["sin"](),
+        "f3": cy_trapz.KERNELS["exp"](),
+        "f4": cy_trapz.KERNELS["reciprocal"](),
+    }
+
+# Test cases: name, scalar function, vectorized function, limits, exact integral and description
+TEST_CASES = [
+    ("f1", f1_scalar, f1_vector, 0, 1, 1 / 3, "f(x) = x^2 from 0 to 1"),
+    ("f2", f2_scalar, f2_vector, 0, math.pi, 2.0, "f(x) = sin(x) from 0 to π"),
+    ("f3", f3_scalar, f3_vector, 0, 1, math.e - 1, "f(x) = e^x from 0 to 1"),
+    ("f4", f4_scalar, f4_vector, 1, 2, math.log(2), "f(x) = 1/x from 1 to 2"),
+]
+
+# Configuration for the measurements
+WARMUPS = 1               # Untimed runs before sampling
+REPEATS = 7               # Timed samples per measurement
+MIN_SAMPLE_TIME = 1e-3    # Fast calls are repeated inside one sample until it takes at least this long
+MAX_EXPONENT = 7          # n is swept over 10^1 .. 10^MAX_EXPONENT (10^7 is the original performance test)
+PYTHON_MAX_N = 10**7      # Backends with a Python call per point are skipped above this n
+ROMBERG_MAX_N = 10**6     # Romberg keeps all its samples in Python lists
+BATCH_INTERVALS = 100     # The batched backends split [a, b] into this many intervals of n / BATCH_INTERVALS trapezoids
+THREADS = os.cpu_count() or 1  # OpenMP threads for the multi-threaded Cython backends
+
+
+def numpy_full(f_vector, a, b, n):
+    """NumPy trapezoidal integration on the full grid (the original NumPy path)."""
+    x = np.linspace(a, b, n + 1)    # Generate evenly spaced sample points
+    return float(trapezoid(f_vector(x), x))
 
-def test_case(f_scalar, f_vector, a, b, n, exact, description):
+
+def romberg_fixed(f_vector, a, b, n):
+    """Romberg integration with tol=0 on 2^k panels, k = round(log2(n)), so it uses about n + 1 samples."""
+    levels = max(1, round(math.log2(n)))
+    return romberg(f_vector, a, b, tol=0, max_levels=levels, vectorized=True)[0]
+
+
+def split(case, n):
+    """Split the interval of a test case for the batched backends: (lower limits, upper limits, trapezoids each)."""
+    count = min(BATCH_INTERVALS, n)
+    edges = np.linspace(case[3], case[4], count + 1)
+    return edges[:-1], edges[1:], n // count
+
+
+def backends():
     """
-    Executes and times the trapezoidal integration using Python, Cython, and NumPy implementations.
-    
-    Parameters:
-    - f_scalar: Function for Python and Cython (scalar input)
-    - f_vector: Function for NumPy (vectorized input)
-    - a: Lower limit of integration
-    - b: Upper limit of integration
-    - n: Number of trapezoids
-    - exact: Exact value of the integral for error calculation
-    - description: Description of the test case
+    Return the available backends as name -> (function(case, n) -> integral, largest n).
     """
-    print(f"\nTest Case: {description}")
-    print(f"Exact Integral: {exact}")
-
-    # Python Trapezoidal Integration Timing
-    timer_py = timeit.Timer(lambda: py_trapz(f_scalar, a, b, n))
-    py_time = timer_py.timeit(number=TIMEIT_NUMBER)  # Measure execution time
-    py_result = py_trapz(f_scalar, a, b, n)         # Get the result
-    py_error = abs(py_result - exact)               # Calculate absolute error
-    print(f"Python Trapezoidal: {py_result} (Error: {py_error}) in {py_time:.6f} seconds")
-
-    # Cython Trapezoidal Integration Timing
-    timer_cy = timeit.Timer(lambda: cy_trapz.cy_trapz(f_scalar, a, b, n))
-    cy_time = timer_cy.timeit(number=TIMEIT_NUMBER)  # Measure execution time
-    cy_result = cy_trapz.cy_trapz(f_scalar, a, b, n)  # Get the result
-    cy_error = abs(cy_result - exact)                # Calculate absolute error
-    print(f"Cython Trapezoidal: {cy_result} (Error: {cy_error}) in {cy_time:.6f} seconds")
-
-    # NumPy Trapezoidal Integration Timing
-    def numpy_trapz_callable():
-        """Callable for NumPy trapezoidal integration."""
-        x = np.linspace(a, b, n + 1)     # Generate evenly spaced sample points
-        y = f_vector(x)                   # Compute function values
-        return np.trapz(y, x)         # Perform integration
-
-    timer_np = timeit.Timer(numpy_trapz_callable)
-    np_time = timer_np.timeit(number=TIMEIT_NUMBER)  # Measure execution time
-    x = np.linspace(a, b, n + 1)                      # Generate sample points
-    y = f_vector(x)                                  # Compute function values
-    np_result = np.trapz(y, x)                       # Perform integration
-    np_error = abs(np_result - exact)                 # Calculate absolute error
-    print(f"NumPy Trapezoidal: {np_result} (Error: {np_error}) in {np_time:.6f} seconds")
-
-def main():
-    """Main function to execute all test cases and the performance test."""
-    # Define all test cases with their respective functions and exact integrals
-    test_cases = [
-        {
-            "f_scalar": f1_scalar,
-            "f_vector": f1_vector,
-            "a": 0,
-            "b": 1,
-            "n": 1000,
-            "exact": 1/3,
-            "description": "f(x) = x^2 from 0 to 1"
-        },
-        {
-            "f_scalar": f2_scalar,
-            "f_vector": f2_vector,
-            "a": 0,
-            "b": math.pi,
-            "n": 1000,
-            "exact": 2.0,
-            "description": "f(x) = sin(x) from 0 to π"
-        },
-        {
-            "f_scalar": f3_scalar,
-            "f_vector": f3_vector,
-            "a": 0,
-            "b": 1,
-            "n": 1000,
-            "exact": math.e - 1,
-            "description": "f(x) = e^x from 0 to 1"
-        },
-        {
-            "f_scalar": f4_scalar,
-            "f_vector": f4_vector,
-            "a": 1,
-            "b": 2,
-            "n": 1000,
-            "exact": math.log(2),
-            "description": "f(x) = 1/x from 1 to 2"
-        },
-    ]
-
-    # Execute each test case
-    for case in test_cases:
-        test_case(
-            f_scalar=case["f_scalar"],
-            f_vector=case["f_vector"],
-            a=case["a"],
-            b=case["b"],
-            n=case["n"],
-            exact=case["exact"],
-            description=case["description"]
+    found = {
+        "py_trapz": (lambda case, n: py_trapz(case[1], case[3], case[4], n), PYTHON_MAX_N),
+        "numpy": (lambda case, n: numpy_full(case[2], case[3], case[4], n), None),
+        "np_trapz": (lambda case, n: np_trapz(case[2], case[3], case[4], n), None),
+        "trapz_batch": (lambda case, n: float(np.sum(trapz_batch(case[2], *split(case, n)))), None),
+        "romberg": (lambda case, n: romberg_fixed(case[2], case[3], case[4], n), ROMBERG_MAX_N),
+    }
+    if cy_trapz is not None:
+        found["cy_trapz"] = (lambda case, n: cy_trapz.cy_trapz(case[1], case[3], case[4], n), PYTHON_MAX_N)
+    if NATIVE:
+        found["cy_trapz_native"] = (lambda case, n: cy_trapz.cy_trapz(NATIVE[case[0]], case[3], case[4], n), None)
+        found["cy_trapz_threads"] = (
+            lambda case, n: cy_trapz.cy_trapz(NATIVE[case[0]], case[3], case[4], n, num_threads=THREADS),
+            None,
+        )
+    if NATIVE and hasattr(cy_trapz, "cy_trapz_batch"):
+        found["cy_trapz_batch"] = (
+            lambda case, n: float(np.sum(cy_trapz.cy_trapz_batch(NATIVE[case[0]], *split(case, n), num_threads=THREADS))),
+            None,
         )
+    return found
+
+
+def measure(call, warmups=WARMUPS, repeats=REPEATS):
+    """
+    Time call() and return its result together with timing statistics.
+
+    Parameters:
+    - call: Function without arguments to time
+    - warmups: Number of untimed runs first
+    - repeats: Number of timed samples
+
+    Returns a dictionary with the result of the last run and the min/median/q1/q3/iqr of the
+    per-call time in seconds.
+    """
+    for _ in range(warmups):
+        call()
+
+    # Repeat very fast calls inside a sample so the timer resolution does not dominate
+    number = 1
+    start = time.perf_counter()
+    result = call()
+    while time.perf_counter() - start < MIN_SAMPLE_TIME and number < 10**6:
+        number *= 10
+        start = time.perf_counter()
+        for _ in range(number):
+            result = call()
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            result = call()
+        samples.append((time.perf_counter() - start) / number)
+
+    q1, median, q3 = statistics.quantiles(samples, n=4, method="inclusive") if len(samples) > 1 else samples * 3
+    return {
+        "result": result,
+        "min": min(samples),
+        "median": median,
+        "q1": q1,
+        "q3": q3,
+        "iqr": q3 - q1,
+        "number": number,
+        "repeats": repeats,
+    }
+
+
+def run(selected=None, max_exponent=MAX_EXPONENT, warmups=WARMUPS, repeats=REPEATS):
+    """
+    Sweep n over decades for every test case and backend.
+
+    Returns a JSON-friendly dictionary; every entry of "results" holds the case, backend, n,
+    integral, absolute error and timing statistics, giving time-vs-n and error-vs-n curves.
+    """
+    available = backends()
+    names = selected or list(available)
+    results = []
+    for case in TEST_CASES:
+        for name in names:
+            function, max_n = available[name]
+            for exponent in range(1, max_exponent + 1):
+                n = 10**exponent
+                if max_n is not None and n > max_n:
+                    break
+                entry = measure(lambda: function(case, n), warmups, repeats)
+                entry.update(case=case[0], description=case[6], backend=name, n=n, error=abs(entry["result"] - case[5]))
+                results.append(entry)
+                print(
+                    f"{case[0]} {name:>16} n=10^{exponent}: median {entry['median']:.3e} s "
+                    f"(IQR {entry['iqr']:.1e}), error {entry['error']:.2e}",
+                    file=sys.stderr,
+                )
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold=0.2, min_seconds=1e-5):
+    """
+    Return the measurements whose best (minimum) time grew by more than threshold (a fraction)
+    against the baseline. The minimum is the least noisy statistic for this; increases smaller
+    than min_seconds are treated as noise.
+    """
+    old = {(r["case"], r["backend"], r["n"]): r for r in baseline["results"]}
+    slowdowns = []
+    for r in results["results"]:
+        key = (r["case"], r["backend"], r["n"])
+        if key in old and r["min"] - old[key]["min"] > min_seconds:
+            ratio = r["min"] / old[key]["min"]
+            if ratio > 1 + threshold:
+                slowdowns.append({"case": key[0], "backend": key[1], "n": key[2], "ratio": ratio})
+    return slowdowns
+
+
+def main(argv=None):
+    """Main function to run the benchmark and optionally compare it against a baseline."""
+    parser = argparse.ArgumentParser(description="Benchmark the trapezoidal integrators.")
+    parser.add_argument("--backends", help="comma separated backends (default: all available)")
+    parser.add_argument("--max-exponent", type=int, default=MAX_EXPONENT, help="sweep n up to 10^this")
+    parser.add_argument("--warmups", type=int, default=WARMUPS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--save-baseline", help="also store the results as a baseline file")
+    parser.add_argument("--baseline", help="compare the results against this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction")
+    args = parser.parse_args(argv)
+
+    results = run(
+        args.backends.split(",") if args.backends else None,
+        args.max_exponent,
+        args.warmups,
+        args.repeats,
+    )
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
 
-    # Performance Test Configuration
-    print("\nPerformance Test: f(x) = x^2 from 0 to 10 with 10,000,000 trapezoids")
-    f_perf_scalar = f1_scalar     # Scalar function for Python and Cython
-    f_perf_vector = f1_vector     # Vectorized function for NumPy
-    a_perf = 0                     # Lower limit
-    b_perf = 10                    # Upper limit
-    n_perf = 10_000_000            # Number of trapezoids
-    exact_perf = (10 ** 3) / 3      # Exact integral value
-
-    # Python Trapezoidal Integration Timing
-    timer_py_perf = timeit.Timer(lambda: py_trapz(f_perf_scalar, a_perf, b_perf, n_perf))
-    py_time = timer_py_perf.timeit(number=TIMEIT_NUMBER)  # Measure execution time
-    py_result = py_trapz(f_perf_scalar, a_perf, b_perf, n_perf)  # Get the result
-    py_error = abs(py_result - exact_perf)                     # Calculate absolute error
-    print(f"Python Trapezoidal: {py_result} in {py_time:.6f} seconds")
-
-    # Cython Trapezoidal Integration Timing
-    timer_cy_perf = timeit.Timer(lambda: cy_trapz.cy_trapz(f_perf_scalar, a_perf, b_perf, n_perf))
-    cy_time = timer_cy_perf.timeit(number=TIMEIT_NUMBER)  # Measure execution time
-    cy_result = cy_trapz.cy_trapz(f_perf_scalar, a_perf, b_perf, n_perf)  # Get the result
-    cy_error = abs(cy_result - exact_perf)                     # Calculate absolute error
-    print(f"Cython Trapezoidal: {cy_result} in {cy_time:.6f} seconds")
-
-    # NumPy Trapezoidal Integration Timing
-    def numpy_trapz_perf():
-        """Callable for NumPy trapezoidal integration in performance test."""
-        x = np.linspace(a_perf, b_perf, n_perf + 1)  # Generate sample points
-        y = f_perf_vector(x)                          # Compute function values
-        return np.trapz(y, x)                    # Perform integration
-
-    timer_np_perf = timeit.Timer(numpy_trapz_perf)
-    np_time = timer_np_perf.timeit(number=TIMEIT_NUMBER)  # Measure execution time
-    x = np.linspace(a_perf, b_perf, n_perf + 1)            # Generate sample points
-    y = f_perf_vector(x)                                    # Compute function values
-    np_result = np.trapz(y, x)                         # Perform integration
-    np_error = abs(np_result - exact_perf)                  # Calculate absolute error
-    print(f"NumPy Trapezoidal: {np_result} in {np_time:.6f} seconds")
+    if args.baseline:
+        with open(args.baseline) as f:
+            slowdowns = compare(results, json.load(f), args.threshold)
+        for s in slowdowns:
+            print(f"SLOWER {s['case']} {s['backend']} n={s['n']}: {s['ratio']:.2f}x", file=sys.stderr)
+        if slowdowns:
+            return 1
+        print("No slowdowns against the baseline", file=sys.stderr)
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
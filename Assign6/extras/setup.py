@@ -1,14 +1,53 @@
 # setup.py
 
-from setuptools import setup
+import os
+import subprocess
+import sys
+import sysconfig
+import tempfile
+
+from setuptools import setup, Extension
 from Cython.Build import cythonize
 import numpy
 
+
+def openmp_flags():
+    """
+    Return the compiler/linker flags for OpenMP, or an empty list if the compiler cannot use it.
+
+    Set CY_TRAPZ_OPENMP=0 to force a serial build. Without OpenMP the prange loops in cy_trapz
+    simply run on one thread.
+    """
+    if os.environ.get("CY_TRAPZ_OPENMP", "1") == "0":
+        return []
+    if sys.platform == "win32":
+        return ["/openmp"]  # MSVC always ships OpenMP
+
+    # Try to build a tiny OpenMP program with the compiler Python was built with
+    compiler = (sysconfig.get_config_var("CC") or "cc").split()
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "probe.c")
+        with open(source, "w") as f:
+            f.write("#include <omp.h>\nint main(void) { return omp_get_max_threads() > 0 ? 0 : 1; }\n")
+        try:
+            result = subprocess.run(
+                compiler + ["-fopenmp", source, "-o", os.path.join(tmp, "probe")],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            return []
+    return ["-fopenmp"] if result.returncode == 0 else []
+
+
+flags = openmp_flags()
+print("Building cy_trapz " + ("with OpenMP" if flags else "without OpenMP (serial prange)"))
+
 # Configure the setup for building the Cython extension
 setup(
-    # cythonize compiles the cy_trapz.pyx file into a C extension
+    # cythonize compiles the cy_trapz.pyx file into a C extension, with OpenMP when it is available
     ext_modules=cythonize(
-        "cy_trapz.pyx",
+        [Extension("cy_trapz", ["cy_trapz.pyx"], extra_compile_args=flags, extra_link_args=flags)],
         compiler_directives={'language_level': "3"}  # Set Python language level to 3
     ),
     # Include NumPy headers for efficient array handling in Cython
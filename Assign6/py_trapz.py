@@ -13,6 +13,8 @@ def py_trapz(f, a, b, n):
     Returns:
     float: Approximation of the integral.
     """
+    if n < 1:
+        raise ValueError(f"n must be at least 1, got {n}")
     h = (b - a) / n                 # Width of each trapezoid
     integral = 0.5 * (f(a) + f(b))  # Initialize integral with first and last terms
     for i in range(1, n):
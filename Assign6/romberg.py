@@ -0,0 +1,127 @@
+# romberg.py
+
+import math
+
+import numpy as np
+
+# Romberg levels (2^k panels) tried on a single interval before the adaptive mode splits it
+LOCAL_LEVELS = 6
+
+# A result is only accepted after at least this many levels, so that lucky early agreement
+# (e.g. sin(x) over a full period, where the first trapezoid sums are all zero) is not trusted
+MIN_LEVELS = 4
+
+
+def _evaluate(f, points, vectorized):
+    # Function values at the given points as a list of floats
+    if vectorized:
+        return np.asarray(f(np.asarray(points, dtype=float)), dtype=float).tolist()
+    return [f(x) for x in points]
+
+
+def _trapezoid_levels(y, width):
+    # Trapezoid sums T_0..T_K from samples y on 2^K + 1 equally spaced points, using every 2^(K-j)-th sample for T_j
+    K = (len(y) - 1).bit_length() - 1
+    levels = []
+    for j in range(K + 1):
+        step = 2 ** (K - j)
+        samples = y[::step]
+        levels.append(width / 2**j * (math.fsum(samples) - 0.5 * (samples[0] + samples[-1])))
+    return levels
+
+
+def _extrapolate(levels):
+    # Romberg table from the trapezoid sums, returning the last two diagonal entries
+    previous = [levels[0]]
+    for k in range(1, len(levels)):
+        row = [levels[k]]
+        for m in range(1, k + 1):
+            row.append(row[m - 1] + (row[m - 1] - previous[m - 1]) / (4**m - 1))
+        if k == len(levels) - 1:
+            return row[k], previous[k - 1]
+        previous = row
+    return previous[0], math.inf
+
+
+def _refine(f, a, b, y, tol, max_levels, vectorized):
+    """
+    Double the panels on [a, b] until the Romberg estimate converges to tol.
+
+    y holds the samples already known on 2^k + 1 equally spaced points and is extended in place.
+    Returns (value, error, evaluations, converged).
+    """
+    width = b - a
+    levels = _trapezoid_levels(y, width)
+    evaluations = 0
+
+    while True:
+        k = len(levels) - 1
+        if k >= 1:
+            value, previous = _extrapolate(levels)
+            error = abs(value - previous)
+            if k >= MIN_LEVELS and error <= tol:
+                return value, error, evaluations, True
+            if k >= max_levels:
+                return value, error, evaluations, False
+
+        # The new points lie halfway between the old ones, every old sample is reused
+        panels = 2 ** (k + 1)
+        h = width / panels
+        new = _evaluate(f, [a + (2 * j + 1) * h for j in range(panels // 2)], vectorized)
+        evaluations += len(new)
+
+        merged = [0.0] * (len(y) + len(new))
+        merged[::2] = y
+        merged[1::2] = new
+        y[:] = merged
+        levels.append(levels[-1] / 2 + h * math.fsum(new))
+
+
+def romberg(f, a, b, tol=1e-12, max_levels=20, adaptive=False, max_depth=50, vectorized=False):
+    """
+    Calculate the definite integral of function f from a to b to within tol using Romberg integration.
+
+    The number of panels is doubled until the Richardson-extrapolated estimates agree to tol, reusing every
+    function value computed so far. With adaptive=True the interval is instead split in halves wherever a few
+    levels do not converge, and each half starts from the samples of its parent.
+
+    Parameters:
+    f (callable): The function to integrate. Must accept and return float (or arrays if vectorized).
+    a (float): The lower limit of integration.
+    b (float): The upper limit of integration.
+    tol (float): Target absolute error.
+    max_levels (int): Most panel doublings (2^max_levels panels) before giving up.
+    adaptive (bool): Subdivide the interval where the integrand is hard instead of refining everywhere.
+    max_depth (int): Deepest subdivision in adaptive mode.
+    vectorized (bool): f accepts a NumPy array of points and returns their values.
+
+    Returns:
+    tuple: (integral, estimated error, number of function evaluations).
+    """
+    y = _evaluate(f, [a, b], vectorized)
+    evaluations = 2
+
+    if not adaptive:
+        value, error, used, _ = _refine(f, a, b, y, tol, max_levels, vectorized)
+        return value, error, evaluations + used
+
+    # Each pending interval carries its samples and its share of the tolerance
+    values = []
+    errors = []
+    pending = [(a, b, y, tol, 0)]
+    while pending:
+        lo, hi, y, local_tol, depth = pending.pop()
+        value, error, used, converged = _refine(f, lo, hi, y, local_tol, LOCAL_LEVELS, vectorized)
+        evaluations += used
+        if converged or depth >= max_depth:
+            values.append(value)
+            errors.append(error)
+            continue
+
+        # Each half starts from its own half of the parent's samples, one level coarser
+        mid = len(y) // 2
+        middle = (lo + hi) / 2
+        pending.append((middle, hi, y[mid:], local_tol / 2, depth + 1))
+        pending.append((lo, middle, y[: mid + 1], local_tol / 2, depth + 1))
+
+    return math.fsum(values), math.fsum(errors), evaluations